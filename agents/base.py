@@ -1,6 +1,7 @@
 """
 Base classes for CLI agents
 """
+import functools
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import AsyncIterator, Optional, List, Dict, Any
@@ -47,6 +48,10 @@ class SessionInfo:
             "is_busy": self.is_busy
         }
 
+    @functools.cached_property
+    def ai_dir(self) -> Path:
+        """AI output directory of this session; work_dir is fixed, so join once."""
+        return Path(self.work_dir) / self.SUBDIR_AI
 
     # Standard subdirectories within a session workspace
     SUBDIR_USER = "user"        # User-uploaded files (attachments)
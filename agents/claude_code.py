@@ -14,8 +14,16 @@ from typing import AsyncIterator, Dict, List, Optional
 from agents.base import BaseAgent, SessionInfo, UsageInfo
 from utils.constants import CLI_OUTPUT_FORMAT_FLAG, CLI_OUTPUT_FORMAT_JSON
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency fallback
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep one except clause.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 class ClaudeCodeAgent(BaseAgent):
     """
@@ -284,7 +292,7 @@ class ClaudeCodeAgent(BaseAgent):
                         yield f"❌ Exit code: {process.returncode}"
                         if raw:
                             try:
-                                data = json.loads(raw)
+                                data = _json_loads(raw)
                                 yield f"\n{data.get('result', raw)}"
                             except json.JSONDecodeError:
                                 yield f"\n{raw}"
@@ -306,7 +314,7 @@ class ClaudeCodeAgent(BaseAgent):
 
             # Parse JSON response
             try:
-                data = json.loads(raw)
+                data = _json_loads(raw)
             except json.JSONDecodeError:
                 # Fallback: treat as plain text
                 logger.warning("Failed to parse Claude JSON output, yielding raw")
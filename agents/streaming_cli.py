@@ -151,64 +151,73 @@ class StreamingCliAgent(BaseAgent):
                 stderr_chunks: list[str] = []
                 saw_stdout_chunk = False
                 try:
-                    async for frame in remote_stream:
-                        if not isinstance(frame, dict):
+                    async for payload in remote_stream:
+                        if not isinstance(payload, dict):
                             continue
-
-                        event = str(frame.get("event", "done")).strip().lower()
-                        if event == "heartbeat":
-                            continue
-
-                        if event == "chunk":
-                            data = str(frame.get("data", "") or "")
-                            if not data:
+                        # A "batch" payload carries several frames in one message.
+                        if str(payload.get("event", "")).strip().lower() == "batch":
+                            frames = payload.get("frames") or ()
+                        else:
+                            frames = (payload,)
+
+                        for frame in frames:
+                            if not isinstance(frame, dict):
                                 continue
-                            stream_name = str(frame.get("stream", "stdout")).strip().lower()
-                            if stream_name == "stderr":
-                                stderr_chunks.append(data)
+
+                            event = str(frame.get("event", "done")).strip().lower()
+                            if event == "heartbeat":
                                 continue
-                            saw_stdout_chunk = True
-                            yield data
-                            continue
 
-                        if event not in {"done", "error"}:
-                            continue
+                            if event == "chunk":
+                                data = str(frame.get("data", "") or "")
+                                if not data:
+                                    continue
+                                stream_name = str(frame.get("stream", "stdout")).strip().lower()
+                                if stream_name == "stderr":
+                                    stderr_chunks.append(data)
+                                    continue
+                                saw_stdout_chunk = True
+                                yield data
+                                continue
 
-                        stdout = str(frame.get("stdout", "") or "")
-                        stderr = str(frame.get("stderr", "") or "").strip()
-                        if stdout and not saw_stdout_chunk:
-                            yield stdout
-                        if not stderr:
-                            stderr = "".join(stderr_chunks).strip()
-                        if stderr:
-                            logger.warning(f"{self.agent_label} stderr: {stderr}")
-
-                        if (
-                            bool(frame.get("returncode", 0)) == 1
-                            and saw_stdout_chunk
-                            and self._is_rollout_recorder_exit(stderr)
-                        ):
-                            # Codex CLI may emit final content but exit 1 due rollout-recorder shutdown noise.
-                            # Keep the successful streamed answer and suppress misleading failure tail.
-                            return
+                            if event not in {"done", "error"}:
+                                continue
 
-                        if bool(frame.get("ok", False)):
+                            stdout = str(frame.get("stdout", "") or "")
+                            stderr = str(frame.get("stderr", "") or "").strip()
+                            if stdout and not saw_stdout_chunk:
+                                yield stdout
+                            if not stderr:
+                                stderr = "".join(stderr_chunks).strip()
+                            if stderr:
+                                logger.warning(f"{self.agent_label} stderr: {stderr}")
+
+                            if (
+                                bool(frame.get("returncode", 0)) == 1
+                                and saw_stdout_chunk
+                                and self._is_rollout_recorder_exit(stderr)
+                            ):
+                                # Codex CLI may emit final content but exit 1 due rollout-recorder shutdown noise.
+                                # Keep the successful streamed answer and suppress misleading failure tail.
+                                return
+
+                            if bool(frame.get("ok", False)):
+                                return
+
+                            reason = str(frame.get("reason", "")).strip()
+                            if not reason:
+                                if frame.get("timed_out"):
+                                    reason = "agent_cli_timeout"
+                                elif "returncode" in frame:
+                                    reason = f"exit_code:{frame.get('returncode')}"
+                                else:
+                                    reason = "remote_exec_failed"
+                            yield f"❌ 远程执行失败: {reason}"
+                            detail = self._user_facing_error_detail(stderr)
+                            if detail:
+                                yield f"\nError: {detail}"
                             return
 
-                        reason = str(frame.get("reason", "")).strip()
-                        if not reason:
-                            if frame.get("timed_out"):
-                                reason = "agent_cli_timeout"
-                            elif "returncode" in frame:
-                                reason = f"exit_code:{frame.get('returncode')}"
-                            else:
-                                reason = "remote_exec_failed"
-                        yield f"❌ 远程执行失败: {reason}"
-                        detail = self._user_facing_error_detail(stderr)
-                        if detail:
-                            yield f"\nError: {detail}"
-                        return
-
                     # Stream ended without terminal frame.
                     yield "❌ 远程执行失败: empty_response"
                     return
@@ -244,30 +253,45 @@ class StreamingCliAgent(BaseAgent):
                 timed_out = False
 
                 try:
-                    while True:
-                        if time.time() - start_time > timeout:
+                    if not self.config.get('stream_output', True):
+                        # Buffered mode: one read() for the whole output instead of
+                        # a readline() round-trip per line.
+                        try:
+                            data = await asyncio.wait_for(process.stdout.read(), timeout=timeout)
+                        except asyncio.TimeoutError:
                             process.kill()
                             await process.wait()
                             timed_out = True
                             yield f"⚠️ 操作超时（{timeout}秒），结果可能不完整"
-                            break
-
-                        try:
-                            line = await asyncio.wait_for(
-                                process.stdout.readline(),
-                                timeout=1.0
-                            )
-                        except asyncio.TimeoutError:
-                            if process.returncode is not None:
+                        else:
+                            text = data.decode('utf-8', errors='replace')
+                            if text:
+                                yield text
+                    else:
+                        while True:
+                            if time.time() - start_time > timeout:
+                                process.kill()
+                                await process.wait()
+                                timed_out = True
+                                yield f"⚠️ 操作超时（{timeout}秒），结果可能不完整"
                                 break
-                            continue
 
-                        if not line:
-                            break
+                            try:
+                                line = await asyncio.wait_for(
+                                    process.stdout.readline(),
+                                    timeout=1.0
+                                )
+                            except asyncio.TimeoutError:
+                                if process.returncode is not None:
+                                    break
+                                continue
+
+                            if not line:
+                                break
 
-                        text = line.decode('utf-8', errors='replace')
-                        if text:
-                            yield text
+                            text = line.decode('utf-8', errors='replace')
+                            if text:
+                                yield text
 
                     if not timed_out:
                         await process.wait()
@@ -255,32 +255,37 @@ class EmailChannel(BaseChannel):
     async def send_file(self, chat_id: str, filepath: str, caption: str = ""):
         """Send email with file attachment"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.username
-            msg['To'] = chat_id
-            msg['Subject'] = "Re: CLI Gateway"
-
-            if caption:
-                msg.attach(MIMEText(caption, 'plain', 'utf-8'))
-
-            # Attach file
-            path = Path(filepath)
-            with open(filepath, 'rb') as f:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(f.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename="{path.name}"'
-            )
-            msg.attach(part)
-
-            await asyncio.to_thread(self._smtp_send, chat_id, msg)
+            # Reading + base64-encoding the attachment is blocking work; keep it
+            # off the event loop together with the SMTP send.
+            await asyncio.to_thread(self._send_file_sync, chat_id, filepath, caption)
             logger.info(f"Email with attachment sent to {chat_id}")
 
         except Exception as e:
             logger.error(f"Failed to send email with attachment: {e}", exc_info=True)
 
+    def _send_file_sync(self, chat_id: str, filepath: str, caption: str) -> None:
+        """Build the attachment email and send it (called via asyncio.to_thread)"""
+        msg = MIMEMultipart()
+        msg['From'] = self.username
+        msg['To'] = chat_id
+        msg['Subject'] = "Re: CLI Gateway"
+
+        if caption:
+            msg.attach(MIMEText(caption, 'plain', 'utf-8'))
+
+        # Attach file
+        path = Path(filepath)
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(path.read_bytes())
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename="{path.name}"'
+        )
+        msg.attach(part)
+
+        self._smtp_send(chat_id, msg)
+
     async def send_typing(self, chat_id: str):
         """No typing indicator for email - no-op"""
         pass
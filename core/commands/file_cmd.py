@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 from typing import TYPE_CHECKING
 
 from core.command_registry import command
@@ -9,6 +10,9 @@ from core.command_registry import command
 if TYPE_CHECKING:
     from core.pipeline import Context
 
+# Cap the /files listing so a busy output dir can't blow past message limits
+_FILES_LIST_LIMIT = 100
+
 
 @command("/files", "列出当前会话输出文件")
 async def handle_files(ctx: "Context") -> None:
@@ -22,17 +26,22 @@ async def handle_files(ctx: "Context") -> None:
     if not agent or current.session_id not in agent.sessions:
         await router._reply(ctx.message, "❌ 会话不可用")
         return
-    ai_dir = agent.sessions[current.session_id].work_dir / "ai"
-    if not ai_dir.exists():
-        await router._reply(ctx.message, "暂无输出文件")
-        return
-    files = [f.name for f in ai_dir.iterdir() if f.is_file()]
+    ai_dir = agent.sessions[current.session_id].ai_dir
+    # scandir yields names + cached d_type, no Path object per entry
+    try:
+        with os.scandir(ai_dir) as it:
+            files = [entry.name for entry in it if entry.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        files = []
     if not files:
         await router._reply(ctx.message, "暂无输出文件")
         return
+    files.sort()
     lines = ["📁 输出文件："]
-    for fname in sorted(files):
+    for fname in files[:_FILES_LIST_LIMIT]:
         lines.append(f"- {fname}")
+    if len(files) > _FILES_LIST_LIMIT:
+        lines.append(f"… 另有 {len(files) - _FILES_LIST_LIMIT} 个文件")
     lines.append("\n使用 /download &lt;filename&gt; 下载")
     await router._reply(ctx.message, "\n".join(lines))
 
@@ -54,14 +63,14 @@ async def handle_download(ctx: "Context") -> None:
     if not agent or current.session_id not in agent.sessions:
         await router._reply(ctx.message, "❌ 会话不可用")
         return
-    ai_dir = agent.sessions[current.session_id].work_dir / "ai"
+    ai_dir = agent.sessions[current.session_id].ai_dir
     ai_dir_resolved = ai_dir.resolve()
     filepath = (ai_dir_resolved / filename).resolve()
     # Path traversal protection
     if not filepath.is_relative_to(ai_dir_resolved):
         await router._reply(ctx.message, "❌ 非法路径")
         return
-    if not filepath.exists() or not filepath.is_file():
+    if not filepath.is_file():
         await router._reply(ctx.message, f"❌ 未找到文件: {filename}")
         return
     await ctx.channel.send_file(ctx.message.chat_id, str(filepath), caption=filename)
@@ -32,8 +32,9 @@ async def command_parser_middleware(ctx: "Context", call_next: Callable[[], Awai
         await call_next()
         return
 
-    parts = text.split()
-    cmd_name = parts[0].split("@")[0].lower()
+    # Only the first token names the command; don't tokenize the rest of a long prompt
+    cmd_token = text.split(maxsplit=1)[0]
+    cmd_name = cmd_token.partition("@")[0].lower()
 
     spec = registry.get(cmd_name)
     if spec:
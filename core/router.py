@@ -26,6 +26,10 @@ import core.commands  # noqa: F401
 
 logger = logging.getLogger(__name__)
 
+_BOLD_TAG_RE = re.compile(r"<b>(.*?)</b>")
+_CODE_TAG_RE = re.compile(r"<code>(.*?)</code>")
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 class Router:
     """Route incoming messages through a middleware pipeline."""
@@ -156,8 +160,8 @@ class Router:
         if channel == "telegram":
             return text
         t = text
-        t = re.sub(r"<b>(.*?)</b>", r"**\1**", t)
-        t = re.sub(r"<code>(.*?)</code>", r"`\1`", t)
+        t = _BOLD_TAG_RE.sub(r"**\1**", t)
+        t = _CODE_TAG_RE.sub(r"`\1`", t)
         t = t.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
         return t
 
@@ -304,7 +308,7 @@ class Router:
 
     @staticmethod
     def _inline_text(value: object, max_chars: int) -> str:
-        text = re.sub(r"\s+", " ", str(value or "")).strip()
+        text = _WHITESPACE_RE.sub(" ", str(value or "")).strip()
         if not text:
             return ""
         limit = max(16, int(max_chars))
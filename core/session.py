@@ -13,10 +13,13 @@ from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Fold the session journal back into the snapshot once it holds this many entries.
+_JOURNAL_COMPACT_AFTER = 256
 
-@dataclass
+
+@dataclass(slots=True)
 class ManagedSession:
-    """Persisted session metadata."""
+    """Persisted session metadata (slotted: many instances, fixed field set)."""
 
     session_id: str
     user_id: str
@@ -45,6 +48,12 @@ class SessionManager:
         self.workspace_base = workspace_base
         self.workspace_base.mkdir(parents=True, exist_ok=True)
         self.state_file = self.workspace_base / ".sessions.json"
+        # Append-only log of small updates (session renames) applied on top of state_file;
+        # folded into the snapshot and truncated on every full _save().
+        self.journal_file = self.workspace_base / ".sessions.journal.jsonl"
+        self._journal_entries = 0
+        # True while the journal file ends in a partial line (crash mid-append).
+        self._journal_torn_tail = False
         self.max_sessions_per_user = max_sessions_per_user
         self.cleanup_inactive_after_hours = cleanup_inactive_after_hours
 
@@ -98,14 +107,73 @@ class SessionManager:
                     history=item.get("history", []),
                 )
             self.sessions = loaded
+            journal_damaged = self._replay_journal()
             # Keep legacy active_by_user functional after introducing active_by_scope.
             if not self.active_by_user:
                 for session in self.sessions.values():
                     self.active_by_user[str(session.user_id)] = session.session_id
+            if journal_damaged:
+                # Fold the good entries into the snapshot and drop the damaged journal,
+                # so later appends never land on a torn line.
+                self._save()
             logger.info("Loaded %d sessions from disk", len(self.sessions))
         except Exception:  # noqa: BLE001
             logger.exception("Failed to load session state from %s", self.state_file)
 
+    def _replay_journal(self) -> bool:
+        """Apply journaled updates; return True if any line had to be skipped."""
+        if not self.journal_file.exists():
+            return False
+        text = self.journal_file.read_text(encoding="utf-8")
+        self._journal_torn_tail = bool(text) and not text.endswith("\n")
+        damaged = False
+        count = 0
+        for line in text.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-append; everything before it is intact.
+                logger.warning("Skipping unreadable session journal line in %s", self.journal_file)
+                damaged = True
+                continue
+            count += 1
+            if not isinstance(entry, dict):
+                logger.warning("Skipping malformed session journal entry in %s", self.journal_file)
+                damaged = True
+                continue
+            session = self.sessions.get(str(entry.get("session_id")))
+            if session is None:
+                continue
+            if entry.get("op") == "name":
+                try:
+                    last_active = float(entry.get("last_active", 0))
+                except (TypeError, ValueError):
+                    logger.warning("Skipping malformed session journal entry in %s", self.journal_file)
+                    damaged = True
+                    continue
+                session.name = entry.get("name")
+                session.last_active = max(session.last_active, last_active)
+        self._journal_entries = count
+        return damaged or self._journal_torn_tail
+
+    def _append_journal(self, entry: Dict[str, object]) -> None:
+        """Persist one small update without rewriting the whole state file."""
+        try:
+            with self._save_lock:
+                with self.journal_file.open("a", encoding="utf-8") as f:
+                    # If compaction failed after a crash, terminate the torn line first.
+                    if self._journal_torn_tail:
+                        f.write("\n")
+                        self._journal_torn_tail = False
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._journal_entries += 1
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to append session journal %s", self.journal_file)
+            self._save()
+            return
+        if self._journal_entries >= _JOURNAL_COMPACT_AFTER:
+            self._save()
+
     def _save(self) -> None:
         payload = {
             "active_by_scope": self.active_by_scope,
@@ -123,6 +191,10 @@ class SessionManager:
                     encoding="utf-8",
                 )
                 tmp_file.replace(self.state_file)
+                # The snapshot now includes every journaled update.
+                self.journal_file.unlink(missing_ok=True)
+                self._journal_entries = 0
+                self._journal_torn_tail = False
         except Exception:  # noqa: BLE001
             logger.exception("Failed to save session state to %s", self.state_file)
 
@@ -388,7 +460,9 @@ class SessionManager:
             return False
         session.name = name
         session.last_active = time.time()
-        self._save()
+        self._append_journal(
+            {"op": "name", "session_id": session_id, "name": name, "last_active": session.last_active}
+        )
         return True
 
     def add_history(self, session_id: str, role: str, content: str, max_entries: int = 20, persist: bool = True) -> None:
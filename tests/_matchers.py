@@ -0,0 +1,32 @@
+"""Substring matchers shared by the test suite."""
+
+import functools
+import re
+
+try:
+    import ahocorasick
+except Exception:  # pragma: no cover - optional dependency fallback
+    ahocorasick = None
+
+
+@functools.lru_cache(maxsize=256)
+def _matcher(needles):
+    """Build (and cache) a single-pass matcher for a tuple of needles."""
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for needle in needles:
+            automaton.add_word(needle, needle)
+        automaton.make_automaton()
+
+        def search(text):
+            return next(automaton.iter(text), None) is not None
+
+        return search
+    return re.compile("|".join(map(re.escape, needles))).search
+
+
+def contains_any(text: str, *needles: str) -> bool:
+    """Return True if any of ``needles`` occurs in ``text`` (one scan of ``text``)."""
+    if not text or not needles:
+        return False
+    return bool(_matcher(needles)(text))
@@ -1,9 +1,15 @@
 """Global fixtures for CLI Gateway test suite."""
 
 import asyncio
+import collections
+import copy
+import dataclasses
+import itertools
+import os
+import tempfile
 import time
 from pathlib import Path
-from typing import AsyncIterator, Dict, List, Optional, Tuple
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -12,20 +18,67 @@ from agents.base import BaseAgent, SessionInfo, UsageInfo
 from channels.base import Attachment, BaseChannel, IncomingMessage
 from core.auth import Auth
 from core.billing import BillingTracker
+from core.router import Router
 from core.session import SessionManager
 
 
+# ── tmp_path on tmpfs ──
+
+_SHM_DIR = "/dev/shm"
+
+
+def pytest_configure(config):
+    """Put tmp_path/tmp_path_factory dirs on tmpfs when available.
+
+    Tests create many session workspaces; tmpfs keeps those mkdir/stat calls
+    off the disk. An explicit --basetemp or PYTEST_DEBUG_TEMPROOT still wins.
+    """
+    if config.option.basetemp or os.environ.get("PYTEST_DEBUG_TEMPROOT"):
+        return
+    if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK | os.X_OK):
+        os.environ["PYTEST_DEBUG_TEMPROOT"] = _SHM_DIR
+
+
+# ── xdist scheduling ──
+
+# Pure-function modules whose tests may each land on a different worker.
+_PER_TEST_GROUP_FILES = frozenset({"test_ops_config.py"})
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    """Assign xdist groups for --dist=loadgroup (before xdist reads the marks).
+
+    Every module stays on one worker (as with loadfile) so module-scoped
+    fixtures and event loops are built once, except the modules listed in
+    _PER_TEST_GROUP_FILES, which are spread out test by test.
+    """
+    if not config.pluginmanager.hasplugin("xdist"):
+        return
+    for item in items:
+        if item.get_closest_marker("xdist_group"):
+            continue
+        if item.path.name in _PER_TEST_GROUP_FILES:
+            group = item.nodeid
+        else:
+            group = item.nodeid.split("::", 1)[0]
+        item.add_marker(pytest.mark.xdist_group(name=group))
+
+
 # ── FakeChannel ──
 
+_FAKE_CHANNEL_HISTORY = 64
+
 
 class FakeChannel(BaseChannel):
     """Test double that records all interactions."""
 
     def __init__(self):
         super().__init__({"max_message_length": 4096, "parse_mode": "HTML"})
-        self.sent: List[Tuple[str, str]] = []  # (chat_id, text)
+        # Bounded ring buffers: tests only look at the most recent interactions.
+        self.sent: Deque[Tuple[str, str]] = collections.deque(maxlen=_FAKE_CHANNEL_HISTORY)  # (chat_id, text)
         self.edited: List[Tuple[str, int, str]] = []  # (chat_id, msg_id, text)
-        self.files_sent: List[Tuple[str, str, str]] = []  # (chat_id, filepath, caption)
+        self.files_sent: Deque[Tuple[str, str, str]] = collections.deque(maxlen=_FAKE_CHANNEL_HISTORY)  # (chat_id, filepath, caption)
         self.typing_count: int = 0
         self.supports_streaming: bool = True
         self._next_message_id: int = 100
@@ -73,9 +126,12 @@ class MockAgent(BaseAgent):
             "supported_params": {"model": "--model", "thinking": "--thinking", "max_turns": "--max-turns"},
             "default_params": {"thinking": "low"},
         }
-        ws = workspace_base or Path("/tmp/test-mock-agent")
+        # Fallback dir is per xdist worker so parallel workers never share it
+        worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        ws = workspace_base or Path(tempfile.gettempdir()) / f"test-mock-agent-{worker}"
         ws.mkdir(parents=True, exist_ok=True)
         super().__init__(name, cfg, ws)
+        # Creation-ordered lists: tests index them directly (created_sessions[0]).
         self.created_sessions: List[str] = []
         self.destroyed_sessions: List[str] = []
         self.messages_received: List[Tuple[str, str]] = []  # (session_id, message)
@@ -161,6 +217,83 @@ class MockAgent(BaseAgent):
         }
 
 
+# ── FakeRemoteClient ──
+
+
+class FakeRemoteClient:
+    """Test double for the system-service client used by remote agent execution."""
+
+    def __init__(self, response: dict):
+        # Returned as-is: agents only read the response, and BaseAgent requires a real dict.
+        self.response = response
+        self.calls = []
+
+    async def execute(self, user_id: str, action: dict, grant_token: str = None):
+        self.calls.append({"user_id": str(user_id), "action": dict(action or {})})
+        return self.response
+
+
+# ── FakeProc ──
+
+
+class FakeProc:
+    """Plain stand-in for asyncio.subprocess.Process (no Mock attribute recording)."""
+
+    def __init__(
+        self,
+        stdout: bytes = b"",
+        stderr: bytes = b"",
+        returncode: Optional[int] = 0,
+        delay_event: Optional[asyncio.Event] = None,
+        communicate_exc: Optional[BaseException] = None,
+    ):
+        self.stdout_data = stdout
+        self.stderr_data = stderr
+        self.returncode = returncode
+        self.delay_event = delay_event
+        self.communicate_exc = communicate_exc
+        self.kill_calls = 0
+
+    async def communicate(self):
+        # With delay_event, block until it is set (or the caller's timeout cancels us)
+        if self.delay_event is not None:
+            await self.delay_event.wait()
+        # communicate_exc simulates a failure such as an already-expired timeout
+        if self.communicate_exc is not None:
+            raise self.communicate_exc
+        return self.stdout_data, self.stderr_data
+
+    async def kill(self):
+        self.kill_calls += 1
+
+    async def wait(self):
+        return self.returncode
+
+
+# ── Subprocess exec recorder ──
+
+
+class ExecRecorder(list):
+    """Stand-in for asyncio.create_subprocess_exec that logs the argv of every call."""
+
+    def __init__(self):
+        super().__init__()
+        self.proc = None
+        self.exc: Optional[BaseException] = None
+
+    def set_proc(self, proc):
+        self.proc = proc
+
+    def set_exc(self, exc: BaseException):
+        self.exc = exc
+
+    async def __call__(self, *args, **kwargs):
+        self.append(args)
+        if self.exc is not None:
+            raise self.exc
+        return self.proc
+
+
 # ── Fixtures ──
 
 
@@ -172,9 +305,9 @@ def tmp_workspace(tmp_path):
     return ws
 
 
-@pytest.fixture
-def sample_config():
-    """Standard test configuration dict."""
+@pytest.fixture(scope="session")
+def sample_config_template():
+    """Read-only standard test configuration, built once per session."""
     return {
         "default_agent": "claude",
         "agents": {
@@ -207,6 +340,12 @@ def sample_config():
     }
 
 
+@pytest.fixture
+def sample_config(sample_config_template):
+    """Standard test configuration dict; a fresh deep copy per test, safe to modify."""
+    return copy.deepcopy(sample_config_template)
+
+
 @pytest.fixture
 def auth(tmp_path):
     """Auth instance with telegram user '123' allowed."""
@@ -225,6 +364,26 @@ def session_manager(tmp_workspace):
     return SessionManager(workspace_base=tmp_workspace, max_sessions_per_user=5, cleanup_inactive_after_hours=24)
 
 
+@pytest.fixture
+def seeded_session(session_manager):
+    """Canonical active "s1" session for the default test user/chat."""
+    return session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+
+
+@pytest.fixture
+def seeded_session_opus(session_manager):
+    """Active "s1" session with non-default model and params (for /params, /reset)."""
+    return session_manager.create_session(
+        "123", "chat_1", "claude", session_id="s1", model="opus", params={"thinking": "high"}
+    )
+
+
+@pytest.fixture
+def seeded_session_thinking_low(session_manager):
+    """Active "s1" session carrying the default thinking param."""
+    return session_manager.create_session("123", "chat_1", "claude", session_id="s1", params={"thinking": "low"})
+
+
 @pytest.fixture
 def mock_agent(tmp_path):
     """MockAgent instance."""
@@ -254,14 +413,75 @@ def fake_channel():
     return FakeChannel()
 
 
+@pytest.fixture
+def make_failing_send():
+    """Factory for an agent send_message replacement that raises exc on first iteration."""
+    def _make(exc: BaseException):
+        async def send(session_id, message, model=None, params=None, run_as_root=False):
+            raise exc
+            yield ""  # unreachable; keeps the async-generator shape the router expects
+        return send
+    return _make
+
+
+@pytest.fixture
+def fake_remote_factory():
+    """Factory to create a FakeRemoteClient returning a canned response."""
+    def _make(response: dict) -> FakeRemoteClient:
+        return FakeRemoteClient(response)
+    return _make
+
+
+@pytest.fixture
+def fake_proc_factory():
+    """Factory to create a FakeProc."""
+    def _make(
+        stdout: bytes = b"",
+        stderr: bytes = b"",
+        returncode: Optional[int] = 0,
+        delay_event: Optional[asyncio.Event] = None,
+        communicate_exc: Optional[BaseException] = None,
+    ) -> FakeProc:
+        return FakeProc(
+            stdout=stdout,
+            stderr=stderr,
+            returncode=returncode,
+            delay_event=delay_event,
+            communicate_exc=communicate_exc,
+        )
+    return _make
+
+
+@pytest.fixture
+def patched_exec(monkeypatch):
+    """Patch asyncio.create_subprocess_exec; returns the ExecRecorder call log."""
+    recorder = ExecRecorder()
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", recorder)
+    return recorder
+
+
 @pytest.fixture
 def billing(tmp_path):
     """BillingTracker backed by tmp dir."""
     return BillingTracker(billing_dir=str(tmp_path / "billing"))
 
 
+@pytest.fixture(scope="session")
+def msg_template():
+    """Default private telegram message; make_message derives from it."""
+    return IncomingMessage(
+        channel="telegram",
+        chat_id="chat_1",
+        user_id="123",
+        text="hello",
+        is_private=True,
+        is_reply_to_bot=False,
+        is_mention_bot=False,
+    )
+
+
 @pytest.fixture
-def make_message():
+def make_message(msg_template):
     """Factory to create IncomingMessage easily."""
     def _make(
         text: str = "hello",
@@ -277,14 +497,14 @@ def make_message():
         attachments: list = None,
         session_hint: str = None,
     ) -> IncomingMessage:
-        return IncomingMessage(
+        # attachments is always passed so messages never share the template's list
+        return dataclasses.replace(
+            msg_template,
             channel=channel,
             chat_id=chat_id,
             user_id=user_id,
             text=text,
             is_private=is_private,
-            is_reply_to_bot=False,
-            is_mention_bot=False,
             is_from_bot=is_from_bot,
             guild_id=guild_id,
             sender_username=sender_username,
@@ -297,28 +517,50 @@ def make_message():
 
 
 @pytest.fixture
-def router(auth, session_manager, mock_agent, fake_channel, sample_config, billing):
+def router_factory(auth, session_manager, mock_agent, fake_channel, sample_config, billing):
+    """Build Routers on the standard mock wiring; keyword arguments override any part."""
+    def _make(**overrides) -> Router:
+        kwargs = dict(
+            auth=auth,
+            session_manager=session_manager,
+            agents={"claude": mock_agent},
+            channel=fake_channel,
+            config=sample_config,
+            billing=billing,
+        )
+        kwargs.update(overrides)
+        return Router(**kwargs)
+    return _make
+
+
+@pytest.fixture
+def isolated_router_factory(tmp_path, router_factory):
+    """Build Routers that each own their channel, agent and session manager.
+
+    Returns (router, channel, agent, session_manager) so tests can drive several
+    routers concurrently without their state interfering.
+    """
+    counter = itertools.count()
+
+    def _make() -> Tuple[Router, FakeChannel, MockAgent, SessionManager]:
+        root = tmp_path / f"isolated_{next(counter)}"
+        workspaces = root / "workspaces"
+        workspaces.mkdir(parents=True)
+        channel = FakeChannel()
+        agent = MockAgent(workspace_base=root / "agent_ws")
+        manager = SessionManager(workspace_base=workspaces, max_sessions_per_user=5, cleanup_inactive_after_hours=24)
+        r = router_factory(channel=channel, agents={"claude": agent}, session_manager=manager)
+        return r, channel, agent, manager
+    return _make
+
+
+@pytest.fixture
+def router(router_factory):
     """Router wired to mock components."""
-    from core.router import Router
-    return Router(
-        auth=auth,
-        session_manager=session_manager,
-        agents={"claude": mock_agent},
-        channel=fake_channel,
-        config=sample_config,
-        billing=billing,
-    )
+    return router_factory()
 
 
 @pytest.fixture
-def multi_agent_router(auth, session_manager, mock_agent, mock_codex_agent, fake_channel, sample_config, billing):
+def multi_agent_router(router_factory, mock_agent, mock_codex_agent):
     """Router with multiple agents."""
-    from core.router import Router
-    return Router(
-        auth=auth,
-        session_manager=session_manager,
-        agents={"claude": mock_agent, "codex": mock_codex_agent},
-        channel=fake_channel,
-        config=sample_config,
-        billing=billing,
-    )
+    return router_factory(agents={"claude": mock_agent, "codex": mock_codex_agent})
@@ -172,6 +172,15 @@ class TestSessionInfoToDict:
         assert d["pid"] == 123
         assert d["is_busy"] is True
 
+    def test_ai_dir_is_cached_subdir(self):
+        si = SessionInfo(
+            session_id="s1", agent_name="test", user_id="u1",
+            work_dir=Path("/tmp/ws"), created_at=1.0, last_active=2.0,
+        )
+        assert si.ai_dir == Path("/tmp/ws") / SessionInfo.SUBDIR_AI
+        assert si.ai_dir is si.ai_dir
+        assert "ai_dir" not in si.to_dict()
+
 
 class TestUsageInfoDefaults:
 
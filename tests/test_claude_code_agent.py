@@ -4,25 +4,26 @@ import asyncio
 import json
 import time
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import pytest_asyncio
 
+from agents import claude_code
 from agents.claude_code import ClaudeCodeAgent
 from agents.base import UsageInfo
+from tests._matchers import contains_any
 
 
-class FakeRemoteClient:
-    def __init__(self, response: dict):
-        self.response = dict(response)
-        self.calls = []
+# Claude --output-format json payload; tests derive variants with `_USAGE_TEMPLATE | {...}`.
+_USAGE_TEMPLATE = {
+    "result": "ok",
+    "usage": {"input_tokens": 200, "output_tokens": 100, "cache_read_input_tokens": 10},
+    "total_cost_usd": 0.005,
+    "duration_ms": 1000,
+}
 
-    async def execute(self, user_id: str, action: dict, grant_token: str = None):
-        self.calls.append({"user_id": str(user_id), "action": dict(action or {})})
-        return dict(self.response)
 
-
-@pytest.fixture
+@pytest.fixture(scope="module")
 def claude_config():
     return {
         "command": "claude",
@@ -35,24 +36,40 @@ def claude_config():
     }
 
 
+@pytest.fixture(scope="module")
+def workspace_root(tmp_path_factory):
+    """Workspace base shared by every agent in this module.
+
+    Sessions get uuid-named work dirs, so agents never collide on disk.
+    """
+    return tmp_path_factory.mktemp("claude")
+
+
 @pytest.fixture
-def agent(tmp_path, claude_config):
-    return ClaudeCodeAgent("claude", claude_config, tmp_path)
+def agent(workspace_root, claude_config):
+    return ClaudeCodeAgent("claude", claude_config, workspace_root)
+
 
+@pytest.fixture(scope="class")
+def class_agent(workspace_root, claude_config):
+    return ClaudeCodeAgent("claude", claude_config, workspace_root)
 
-def _make_mock_process(stdout_data: bytes = b"", stderr_data: bytes = b"", returncode: int = 0):
-    """Create a mock asyncio subprocess."""
-    proc = AsyncMock()
-    proc.returncode = returncode
-    proc.communicate = AsyncMock(return_value=(stdout_data, stderr_data))
-    proc.kill = AsyncMock()
-    proc.wait = AsyncMock()
-    return proc
+
+@pytest_asyncio.fixture(scope="class")
+async def class_session(class_agent):
+    return await class_agent.create_session("u1", "c1")
+
+
+@pytest.fixture
+def shared_session(class_agent, class_session):
+    """Class-wide session, reset so each test starts on the --session-id branch."""
+    class_agent._initialized_sessions.discard(class_session.session_id)
+    class_agent._last_usage.pop(class_session.session_id, None)
+    return class_session
 
 
 class TestCreateSession:
 
-    @pytest.mark.asyncio
     async def test_create_session(self, agent):
         info = await agent.create_session("u1", "c1")
         assert info.session_id is not None
@@ -66,109 +83,98 @@ class TestCreateSession:
 
 class TestSendMessage:
 
-    @pytest.mark.asyncio
-    async def test_send_message_success(self, agent):
-        session = await agent.create_session("u1", "c1")
+    @pytest.fixture
+    def agent(self, class_agent):
+        return class_agent
+
+    async def test_send_message_success(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
         json_response = json.dumps({
             "result": "Hello world!",
             "usage": {"input_tokens": 100, "output_tokens": 50},
             "total_cost_usd": 0.001,
             "duration_ms": 500,
         })
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test prompt"):
-                chunks.append(chunk)
+        patched_exec.set_proc(mock_proc)
+        text = "".join([c async for c in agent.send_message(sid, "test prompt")])
 
-        assert "Hello world!" in "".join(chunks)
+        assert "Hello world!" in text
 
-    @pytest.mark.asyncio
-    async def test_send_message_usage_extraction(self, agent):
-        session = await agent.create_session("u1", "c1")
-        json_response = json.dumps({
-            "result": "ok",
-            "usage": {"input_tokens": 200, "output_tokens": 100, "cache_read_input_tokens": 10},
-            "total_cost_usd": 0.005,
-            "duration_ms": 1000,
-            "modelUsage": {"claude-opus-4-6": {}},
-        })
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+    async def test_send_message_usage_extraction(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
+        json_response = json.dumps(_USAGE_TEMPLATE | {"modelUsage": {"claude-opus-4-6": {}}})
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            async for _ in agent.send_message(session.session_id, "test"):
-                pass
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(sid, "test"):
+            pass
 
-        usage = agent.get_last_usage(session.session_id)
+        usage = agent.get_last_usage(sid)
         assert usage is not None
         assert usage.input_tokens == 200
         assert usage.output_tokens == 100
         assert usage.cost_usd == 0.005
         assert usage.model == "claude-opus-4-6"
 
-    @pytest.mark.asyncio
-    async def test_send_message_first_call_uses_session_id(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_send_message_first_call_uses_session_id(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
         json_response = json.dumps({"result": "ok"})
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
-            async for _ in agent.send_message(session.session_id, "test"):
-                pass
-            # Check args contain --session-id
-            call_args = mock_exec.call_args
-            all_args = list(call_args[0])
-            assert "--session-id" in all_args
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(sid, "test"):
+            pass
+        # Check args contain --session-id
+        args = patched_exec[-1]
+        assert "--session-id" in args
 
-    @pytest.mark.asyncio
-    async def test_send_message_resume_uses_resume(self, agent):
+    async def test_send_message_resume_uses_resume(self, agent, patched_exec, fake_proc_factory):
         session = await agent.create_session("u1", "c1")
+        sid = session.session_id
         json_response = json.dumps({"result": "ok"})
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
         # First call
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            async for _ in agent.send_message(session.session_id, "first"):
-                pass
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(sid, "first"):
+            pass
 
         # Second call should use --resume
-        mock_proc2 = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc2) as mock_exec:
-            async for _ in agent.send_message(session.session_id, "second"):
-                pass
-            all_args = list(mock_exec.call_args[0])
-            assert "--resume" in all_args
-            assert "--session-id" not in all_args
-
-    @pytest.mark.asyncio
-    async def test_send_message_with_model(self, agent):
-        session = await agent.create_session("u1", "c1")
+        mock_proc2 = fake_proc_factory(stdout=json_response.encode(), returncode=0)
+        patched_exec.set_proc(mock_proc2)
+        async for _ in agent.send_message(sid, "second"):
+            pass
+        args = patched_exec[-1]
+        assert "--resume" in args
+        assert "--session-id" not in args
+
+    async def test_send_message_with_model(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
         json_response = json.dumps({"result": "ok"})
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
-            async for _ in agent.send_message(session.session_id, "test", model="opus"):
-                pass
-            all_args = list(mock_exec.call_args[0])
-            assert "--model" in all_args
-            assert "claude-opus-4-6" in all_args
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(sid, "test", model="opus"):
+            pass
+        args = patched_exec[-1]
+        assert "--model" in args
+        assert "claude-opus-4-6" in args
 
-    @pytest.mark.asyncio
-    async def test_send_message_with_params(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_send_message_with_params(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
         json_response = json.dumps({"result": "ok"})
-        mock_proc = _make_mock_process(stdout_data=json_response.encode(), returncode=0)
+        mock_proc = fake_proc_factory(stdout=json_response.encode(), returncode=0)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
-            async for _ in agent.send_message(session.session_id, "test", params={"thinking": "high"}):
-                pass
-            all_args = list(mock_exec.call_args[0])
-            assert "--thinking" in all_args
-            assert "high" in all_args
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(sid, "test", params={"thinking": "high"}):
+            pass
+        args = patched_exec[-1]
+        assert "--thinking" in args
+        assert "high" in args
 
-    @pytest.mark.asyncio
-    async def test_send_message_uses_remote_system_client_when_configured(self, tmp_path, claude_config):
+    async def test_send_message_uses_remote_system_client_when_configured(self, workspace_root, claude_config, fake_remote_factory, patched_exec):
         remote_payload = {
             "ok": True,
             "returncode": 0,
@@ -182,24 +188,22 @@ class TestSendMessage:
             ),
             "stderr": "",
         }
-        remote = FakeRemoteClient(remote_payload)
+        remote = fake_remote_factory(remote_payload)
         agent = ClaudeCodeAgent(
             "claude",
             claude_config,
-            tmp_path,
+            workspace_root,
             runtime_mode="session",
             instance_id="user-main",
             system_client=remote,
         )
         session = await agent.create_session("u1", "c1")
+        sid = session.session_id
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test prompt"):
-                chunks.append(chunk)
+        text = "".join([c async for c in agent.send_message(sid, "test prompt")])
 
-        assert "remote-result" in "".join(chunks)
-        assert not mock_exec.called
+        assert "remote-result" in text
+        assert not patched_exec
         assert len(remote.calls) == 1
         action = remote.calls[0]["action"]
         assert action["op"] == "agent_cli_exec"
@@ -207,142 +211,123 @@ class TestSendMessage:
         assert action["mode"] == "session"
         assert action["instance_id"] == "user-main"
 
-    @pytest.mark.asyncio
-    async def test_send_message_system_sudo_appends_dangerous_skip_permissions(self, tmp_path, claude_config):
+    async def test_send_message_system_sudo_appends_dangerous_skip_permissions(self, workspace_root, claude_config, fake_remote_factory, patched_exec):
         remote_payload = {
             "ok": True,
             "returncode": 0,
             "stdout": json.dumps({"result": "remote-result", "usage": {"input_tokens": 1, "output_tokens": 1}}),
             "stderr": "",
         }
-        remote = FakeRemoteClient(remote_payload)
+        remote = fake_remote_factory(remote_payload)
         agent = ClaudeCodeAgent(
             "claude",
             claude_config,
-            tmp_path,
+            workspace_root,
             runtime_mode="system",
             instance_id="ops-a",
             system_client=remote,
         )
         session = await agent.create_session("u1", "c1")
+        sid = session.session_id
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test prompt", run_as_root=True):
-                chunks.append(chunk)
+        text = "".join([c async for c in agent.send_message(sid, "test prompt", run_as_root=True)])
 
-        assert "remote-result" in "".join(chunks)
-        assert not mock_exec.called
+        assert "remote-result" in text
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--dangerously-skip-permissions" in action["args"]
         assert "--permission-mode" in action["args"]
         idx = action["args"].index("--permission-mode")
         assert action["args"][idx + 1] == "bypassPermissions"
 
-    @pytest.mark.asyncio
-    async def test_send_message_system_without_sudo_keeps_default_permissions(self, tmp_path, claude_config):
+    async def test_send_message_system_without_sudo_keeps_default_permissions(self, workspace_root, claude_config, fake_remote_factory, patched_exec):
         remote_payload = {
             "ok": True,
             "returncode": 0,
             "stdout": json.dumps({"result": "remote-result", "usage": {"input_tokens": 1, "output_tokens": 1}}),
             "stderr": "",
         }
-        remote = FakeRemoteClient(remote_payload)
+        remote = fake_remote_factory(remote_payload)
         agent = ClaudeCodeAgent(
             "claude",
             claude_config,
-            tmp_path,
+            workspace_root,
             runtime_mode="system",
             instance_id="ops-a",
             system_client=remote,
         )
         session = await agent.create_session("u1", "c1")
+        sid = session.session_id
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test prompt", run_as_root=False):
-                chunks.append(chunk)
+        text = "".join([c async for c in agent.send_message(sid, "test prompt", run_as_root=False)])
 
-        assert "remote-result" in "".join(chunks)
-        assert not mock_exec.called
+        assert "remote-result" in text
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--dangerously-skip-permissions" not in action["args"]
 
-    @pytest.mark.asyncio
-    async def test_send_message_timeout(self, agent):
-        session = await agent.create_session("u1", "c1")
-        mock_proc = AsyncMock()
-        mock_proc.returncode = None
-        mock_proc.communicate = AsyncMock(side_effect=asyncio.TimeoutError())
-        mock_proc.kill = AsyncMock()
-        mock_proc.wait = AsyncMock()
-
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            text = "".join(chunks)
-            assert "超时" in text
-
-    @pytest.mark.asyncio
-    async def test_send_message_nonzero_exit(self, agent):
-        session = await agent.create_session("u1", "c1")
-        mock_proc = _make_mock_process(stdout_data=b"error output", stderr_data=b"err", returncode=1)
+    async def test_send_message_timeout(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
+        mock_proc = fake_proc_factory(returncode=None, communicate_exc=asyncio.TimeoutError())
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            text = "".join(chunks)
-            assert "Exit code: 1" in text
+        patched_exec.set_proc(mock_proc)
+        text = "".join([c async for c in agent.send_message(sid, "test")])
+        assert "超时" in text
 
-    @pytest.mark.asyncio
-    async def test_send_message_invalid_json(self, agent):
-        session = await agent.create_session("u1", "c1")
-        mock_proc = _make_mock_process(stdout_data=b"not json at all", returncode=0)
+    async def test_send_message_nonzero_exit(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
+        mock_proc = fake_proc_factory(stdout=b"error output", stderr=b"err", returncode=1)
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            assert "not json at all" in "".join(chunks)
+        patched_exec.set_proc(mock_proc)
+        text = "".join([c async for c in agent.send_message(sid, "test")])
+        assert "Exit code: 1" in text
+
+    async def test_send_message_invalid_json(self, agent, shared_session, patched_exec, fake_proc_factory):
+        sid = shared_session.session_id
+        mock_proc = fake_proc_factory(stdout=b"not json at all", returncode=0)
+
+        patched_exec.set_proc(mock_proc)
+        text = "".join([c async for c in agent.send_message(sid, "test")])
+        assert "not json at all" in text
+
+    async def test_send_message_command_not_found(self, agent, shared_session, patched_exec):
+        sid = shared_session.session_id
+        patched_exec.set_exc(FileNotFoundError("claude not found"))
+        text = "".join([c async for c in agent.send_message(sid, "test")])
+        assert contains_any(text, "未安装", "未找到")
 
-    @pytest.mark.asyncio
-    async def test_send_message_command_not_found(self, agent):
-        session = await agent.create_session("u1", "c1")
-        with patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError("claude not found")):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            text = "".join(chunks)
-            assert "未安装" in text or "未找到" in text
-
-    @pytest.mark.asyncio
     async def test_send_message_session_not_found(self, agent):
         with pytest.raises(ValueError, match="not found"):
             async for _ in agent.send_message("nonexistent", "test"):
                 pass
 
 
+class TestJsonParsing:
+
+    def test_loads_matches_stdlib(self):
+        raw = json.dumps({"result": "你好", "usage": {"input_tokens": 1}, "total_cost_usd": 0.5})
+        assert claude_code._json_loads(raw) == json.loads(raw)
+
+    def test_invalid_json_raises_stdlib_error(self):
+        with pytest.raises(json.JSONDecodeError):
+            claude_code._json_loads("not json at all")
+
+
 class TestCancel:
 
-    @pytest.mark.asyncio
-    async def test_cancel(self, agent):
+    async def test_cancel(self, agent, fake_proc_factory):
         session = await agent.create_session("u1", "c1")
-        mock_proc = AsyncMock()
-        mock_proc.returncode = None
-        mock_proc.kill = AsyncMock()
-        mock_proc.wait = AsyncMock()
-        agent._processes[session.session_id] = mock_proc
+        sid = session.session_id
+        mock_proc = fake_proc_factory(returncode=None)
+        agent._processes[sid] = mock_proc
 
-        await agent.cancel(session.session_id)
-        mock_proc.kill.assert_called_once()
-        assert session.session_id not in agent._processes
+        await agent.cancel(sid)
+        assert mock_proc.kill_calls == 1
+        assert sid not in agent._processes
 
 
 class TestDestroySession:
 
-    @pytest.mark.asyncio
     async def test_destroy_session(self, agent):
         session = await agent.create_session("u1", "c1")
         sid = session.session_id
@@ -350,7 +335,6 @@ class TestDestroySession:
         assert sid not in agent.sessions
         assert sid not in agent._initialized_sessions
 
-    @pytest.mark.asyncio
     async def test_destroy_nonexistent(self, agent):
         with pytest.raises(ValueError):
             await agent.destroy_session("nonexistent")
@@ -358,10 +342,10 @@ class TestDestroySession:
 
 class TestHealthCheck:
 
-    @pytest.mark.asyncio
     async def test_health_check_active(self, agent):
         session = await agent.create_session("u1", "c1")
-        h = agent.health_check(session.session_id)
+        sid = session.session_id
+        h = agent.health_check(sid)
         assert h["alive"] is True
         assert h["busy"] is False
 
@@ -372,20 +356,15 @@ class TestHealthCheck:
 
 class TestProcessLifecycle:
 
-    @pytest.mark.asyncio
     async def test_is_process_alive_false_when_no_process(self, agent):
         assert agent.is_process_alive("s1") is False
 
-    @pytest.mark.asyncio
-    async def test_is_process_alive_true(self, agent):
-        mock_proc = MagicMock()
-        mock_proc.returncode = None  # Still running
+    async def test_is_process_alive_true(self, agent, fake_proc_factory):
+        mock_proc = fake_proc_factory(returncode=None)  # Still running
         agent._processes["s1"] = mock_proc
         assert agent.is_process_alive("s1") is True
 
-    @pytest.mark.asyncio
-    async def test_is_process_alive_false_when_finished(self, agent):
-        mock_proc = MagicMock()
-        mock_proc.returncode = 0
+    async def test_is_process_alive_false_when_finished(self, agent, fake_proc_factory):
+        mock_proc = fake_proc_factory(returncode=0)
         agent._processes["s1"] = mock_proc
         assert agent.is_process_alive("s1") is False
@@ -1,37 +1,40 @@
 """Tests for agents/codex_cli.py — CodexAgent."""
 
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from collections import ChainMap
+from types import MappingProxyType
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 
 from agents.codex_cli import CodexAgent
+from tests._matchers import contains_any
 
 
-class FakeRemoteClient:
-    def __init__(self, response: dict):
-        self.response = dict(response)
+class FakeRemoteStreamClient:
+    def __init__(self, frames: list[dict]):
+        self.frames = tuple(frames)
         self.calls = []
 
-    async def execute(self, user_id: str, action: dict, grant_token: str = None):
+    async def execute_stream(self, user_id: str, action: dict, grant_token: str = None):
         self.calls.append({"user_id": str(user_id), "action": dict(action or {})})
-        return dict(self.response)
+        for frame in self.frames:
+            yield frame
 
 
-class FakeRemoteStreamClient:
-    def __init__(self, frames: list[dict]):
-        self.frames = [dict(f) for f in frames]
-        self.calls = []
+class FakeBatchedRemoteStreamClient(FakeRemoteStreamClient):
+    """Same frames as FakeRemoteStreamClient, delivered as a single batch payload."""
 
     async def execute_stream(self, user_id: str, action: dict, grant_token: str = None):
         self.calls.append({"user_id": str(user_id), "action": dict(action or {})})
-        for frame in self.frames:
-            yield dict(frame)
+        yield {"event": "batch", "frames": list(self.frames)}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def codex_config():
-    return {
+    """Read-only agent config; tests that need overrides layer them with ChainMap."""
+    return MappingProxyType({
         "command": "codex",
         "args_template": ["-p", "{prompt}", "--session-id", "{session_id}"],
         "models": {"gpt5": "gpt-5.3"},
@@ -39,39 +42,56 @@ def codex_config():
         "supported_params": {"model": "--model", "temperature": "--temperature"},
         "default_params": {},
         "timeout": 5,
-    }
-
+    })
 
-@pytest.fixture
-def agent(tmp_path, codex_config):
-    return CodexAgent("codex", codex_config, tmp_path)
 
+@pytest.fixture(scope="module")
+def agent(tmp_path_factory, codex_config):
+    """One agent per module; tests that need a clean agent build their own."""
+    return CodexAgent("codex", codex_config, tmp_path_factory.mktemp("codex"))
 
-def _make_streaming_process(lines: list[bytes], returncode: int = 0):
-    """Create a mock process that streams lines."""
-    proc = AsyncMock()
-    proc.returncode = returncode
 
-    # stdout readline returns lines then b""
-    line_iter = iter(lines + [b""])
-    async def readline():
-        return next(line_iter)
-    proc.stdout = AsyncMock()
-    proc.stdout.readline = readline
+@pytest_asyncio.fixture
+async def session(agent):
+    info = await agent.create_session("u1", "c1")
+    yield info
+    agent.sessions.pop(info.session_id, None)
 
-    # stderr
-    proc.stderr = AsyncMock()
-    proc.stderr.read = AsyncMock(return_value=b"")
 
+def _make_streaming_process(lines: list[bytes], returncode: int = 0, bulk: bool = False):
+    """Create a mock process that streams lines (or returns them from one read() if bulk)."""
+    # Fresh mock per call: only wait/kill (and stderr.read) are awaited.
+    proc = MagicMock()
     proc.wait = AsyncMock()
     proc.kill = AsyncMock()
+    proc.returncode = returncode
+    proc.stdout = MagicMock()
+
+    if bulk:
+        proc.stdout.read = AsyncMock(return_value=b"".join(lines))
+        proc.stdout.readline = AsyncMock(return_value=b"")
+    elif not lines:
+        # No output: EOF on the first readline, no closure needed
+        proc.stdout.readline = AsyncMock(return_value=b"")
+    else:
+        # stdout readline returns lines then b"" (EOF) forever
+        frames = (*lines, b"")
+        proc._idx = 0
+        async def readline():
+            i = proc._idx
+            proc._idx = i + 1
+            return frames[i] if i < len(frames) else b""
+        proc.stdout.readline = readline
+
+    # stderr
+    proc.stderr = MagicMock()
+    proc.stderr.read = AsyncMock(return_value=b"")
 
     return proc
 
 
 class TestCreateSession:
 
-    @pytest.mark.asyncio
     async def test_create_session(self, agent):
         info = await agent.create_session("u1", "c1")
         assert info.session_id is not None
@@ -82,38 +102,44 @@ class TestCreateSession:
 
 class TestSendMessage:
 
-    @pytest.mark.asyncio
-    async def test_send_message_streaming(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_send_message_streaming(self, agent, session, patched_exec):
         lines = [b"line 1\n", b"line 2\n", b"line 3\n"]
         mock_proc = _make_streaming_process(lines, returncode=0)
         # Set returncode after wait
         mock_proc.returncode = 0
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
+        patched_exec.set_proc(mock_proc)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
         assert len(chunks) >= 3
         assert "line 1\n" in chunks
 
-    @pytest.mark.asyncio
-    async def test_send_message_adds_skip_git_repo_check(self, agent):
+    async def test_send_message_buffered_output_uses_single_read(self, tmp_path, codex_config, patched_exec):
+        cfg = ChainMap({"stream_output": False}, codex_config)
+        agent = CodexAgent("codex", cfg, tmp_path)
         session = await agent.create_session("u1", "c1")
+        mock_proc = _make_streaming_process([b"line 1\n", b"line 2\n"], returncode=0, bulk=True)
+
+        patched_exec.set_proc(mock_proc)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
+
+        assert chunks == ["line 1\nline 2\n"]
+        mock_proc.stdout.read.assert_awaited_once()
+        mock_proc.stdout.readline.assert_not_awaited()
+
+    async def test_send_message_adds_skip_git_repo_check(self, agent, session, patched_exec):
         mock_proc = _make_streaming_process([b"ok\n"], returncode=0)
         mock_proc.returncode = 0
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
-            async for _ in agent.send_message(session.session_id, "test"):
-                pass
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(session.session_id, "test"):
+            pass
 
-        args = mock_exec.call_args.args
+        args = patched_exec[-1]
         assert "--skip-git-repo-check" in args
 
-    @pytest.mark.asyncio
-    async def test_send_message_uses_remote_system_client_when_configured(self, tmp_path, codex_config):
-        remote = FakeRemoteClient({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
+    async def test_send_message_uses_remote_system_client_when_configured(self, tmp_path, codex_config, fake_remote_factory, patched_exec):
+        remote = fake_remote_factory({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
         agent = CodexAgent(
             "codex",
             codex_config,
@@ -124,13 +150,10 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
-        assert "remote-ok" in "".join(chunks)
-        assert not mock_exec.called
+        assert any("remote-ok" in c for c in chunks)
+        assert not patched_exec
         assert len(remote.calls) == 1
         action = remote.calls[0]["action"]
         assert action["op"] == "agent_cli_exec"
@@ -138,11 +161,9 @@ class TestSendMessage:
         assert action["mode"] == "session"
         assert action["instance_id"] == "user-main"
 
-    @pytest.mark.asyncio
-    async def test_send_message_system_sudo_appends_dangerous_bypass(self, tmp_path, codex_config):
-        cfg = dict(codex_config)
-        cfg["args_template"] = ["exec", "{prompt}", "--full-auto"]
-        remote = FakeRemoteClient({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
+    async def test_send_message_system_sudo_appends_dangerous_bypass(self, tmp_path, codex_config, fake_remote_factory, patched_exec):
+        cfg = ChainMap({"args_template": ["exec", "{prompt}", "--full-auto"]}, codex_config)
+        remote = fake_remote_factory({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
         agent = CodexAgent(
             "codex",
             cfg,
@@ -153,22 +174,17 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test", run_as_root=True):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test", run_as_root=True)]
 
-        assert "remote-ok" in "".join(chunks)
-        assert not mock_exec.called
+        assert any("remote-ok" in c for c in chunks)
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--dangerously-bypass-approvals-and-sandbox" in action["args"]
         assert "--full-auto" not in action["args"]
 
-    @pytest.mark.asyncio
-    async def test_send_message_system_without_sudo_keeps_full_auto(self, tmp_path, codex_config):
-        cfg = dict(codex_config)
-        cfg["args_template"] = ["exec", "{prompt}", "--full-auto"]
-        remote = FakeRemoteClient({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
+    async def test_send_message_system_without_sudo_keeps_full_auto(self, tmp_path, codex_config, fake_remote_factory, patched_exec):
+        cfg = ChainMap({"args_template": ["exec", "{prompt}", "--full-auto"]}, codex_config)
+        remote = fake_remote_factory({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
         agent = CodexAgent(
             "codex",
             cfg,
@@ -179,19 +195,15 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test", run_as_root=False):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test", run_as_root=False)]
 
-        assert "remote-ok" in "".join(chunks)
-        assert not mock_exec.called
+        assert any("remote-ok" in c for c in chunks)
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--full-auto" in action["args"]
         assert "--dangerously-bypass-approvals-and-sandbox" not in action["args"]
 
-    @pytest.mark.asyncio
-    async def test_send_message_uses_remote_stream_frames_when_supported(self, tmp_path, codex_config):
+    async def test_send_message_uses_remote_stream_frames_when_supported(self, tmp_path, codex_config, patched_exec):
         remote = FakeRemoteStreamClient(
             [
                 {"event": "chunk", "stream": "stdout", "data": "hello "},
@@ -209,18 +221,39 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
-        assert "".join(chunks) == "hello world"
-        assert not mock_exec.called
+        assert chunks == ["hello ", "world"]
+        assert not patched_exec
         assert len(remote.calls) == 1
         action = remote.calls[0]["action"]
         assert action["stream"] is True
 
-    @pytest.mark.asyncio
+    async def test_send_message_accepts_batched_remote_stream_frames(self, tmp_path, codex_config, patched_exec):
+        remote = FakeBatchedRemoteStreamClient(
+            [
+                {"event": "chunk", "stream": "stdout", "data": "hello "},
+                {"event": "heartbeat"},
+                {"event": "chunk", "stream": "stdout", "data": "world"},
+                {"event": "done", "ok": True, "returncode": 0, "stdout": "hello world"},
+            ]
+        )
+        agent = CodexAgent(
+            "codex",
+            codex_config,
+            tmp_path,
+            runtime_mode="session",
+            instance_id="user-main",
+            system_client=remote,
+        )
+        session = await agent.create_session("u1", "c1")
+
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
+
+        assert chunks == ["hello ", "world"]
+        assert not patched_exec
+        assert len(remote.calls) == 1
+
     async def test_send_message_remote_stream_does_not_duplicate_done_stdout(self, tmp_path, codex_config):
         remote = FakeRemoteStreamClient(
             [
@@ -239,13 +272,10 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        chunks = []
-        async for chunk in agent.send_message(session.session_id, "test"):
-            chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
-        assert "".join(chunks) == "hello world"
+        assert chunks == ["hello ", "world"]
 
-    @pytest.mark.asyncio
     async def test_send_message_remote_stream_rollout_recorder_error_is_suppressed(self, tmp_path, codex_config):
         stderr = (
             "2026-02-18T18:17:42Z ERROR codex_core::codex: failed to record rollout items: "
@@ -268,15 +298,12 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        chunks = []
-        async for chunk in agent.send_message(session.session_id, "test"):
-            chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
         text = "".join(chunks)
         assert text == "@songsjun 你好"
         assert "远程执行失败" not in text
 
-    @pytest.mark.asyncio
     async def test_send_message_remote_stream_hides_channel_context_stderr_dump(self, tmp_path, codex_config):
         remote = FakeRemoteStreamClient(
             [
@@ -298,16 +325,13 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        chunks = []
-        async for chunk in agent.send_message(session.session_id, "test"):
-            chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
         text = "".join(chunks)
         assert "远程执行失败" in text
         assert "[CHANNEL CONTEXT]" not in text
 
-    @pytest.mark.asyncio
-    async def test_send_message_fails_closed_when_remote_required_but_unconfigured(self, tmp_path, codex_config):
+    async def test_send_message_fails_closed_when_remote_required_but_unconfigured(self, tmp_path, codex_config, patched_exec):
         agent = CodexAgent(
             "codex",
             codex_config,
@@ -319,53 +343,45 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
 
         text = "".join(chunks)
         assert "远程执行失败: system_client_required" in text
-        assert not mock_exec.called
+        assert not patched_exec
+
+    async def test_send_message_reports_exit_code_without_output(self, agent, session, patched_exec):
+        patched_exec.set_proc(_make_streaming_process([], returncode=2))
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
+        assert any("Exit code: 2" in c for c in chunks)
+
+    async def test_send_message_command_not_found(self, agent, session, patched_exec):
+        patched_exec.set_exc(FileNotFoundError())
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
+        text = "".join(chunks)
+        assert contains_any(text, "未安装", "未找到")
 
-    @pytest.mark.asyncio
-    async def test_send_message_command_not_found(self, agent):
-        session = await agent.create_session("u1", "c1")
-        with patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError()):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            text = "".join(chunks)
-            assert "未安装" in text or "未找到" in text
-
-    @pytest.mark.asyncio
     async def test_send_message_session_not_found(self, agent):
         with pytest.raises(ValueError, match="not found"):
             async for _ in agent.send_message("nonexistent", "test"):
                 pass
 
-    @pytest.mark.asyncio
-    async def test_busy_flag_reset_after_message(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_busy_flag_reset_after_message(self, agent, session, patched_exec):
         mock_proc = _make_streaming_process([b"ok\n"], returncode=0)
         mock_proc.returncode = 0
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            async for _ in agent.send_message(session.session_id, "test"):
-                pass
+        patched_exec.set_proc(mock_proc)
+        async for _ in agent.send_message(session.session_id, "test"):
+            pass
         assert session.is_busy is False
 
 
 class TestDestroySession:
 
-    @pytest.mark.asyncio
-    async def test_destroy_session(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_destroy_session(self, agent, session):
         sid = session.session_id
         await agent.destroy_session(sid)
         assert sid not in agent.sessions
 
-    @pytest.mark.asyncio
     async def test_destroy_nonexistent(self, agent):
         with pytest.raises(ValueError):
             await agent.destroy_session("nope")
@@ -373,9 +389,7 @@ class TestDestroySession:
 
 class TestHealthCheck:
 
-    @pytest.mark.asyncio
-    async def test_health_check_active(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_health_check_active(self, agent, session):
         h = agent.health_check(session.session_id)
         assert h["alive"] is True
 
@@ -3,6 +3,8 @@
 import re
 import pytest
 
+import core.commands  # noqa: F401 - populates the registry
+from core.command_registry import registry
 from utils.constants import (
     MAX_ATTACHMENT_SIZE_BYTES,
     MAX_MESSAGE_LENGTH,
@@ -12,32 +14,28 @@ from utils.constants import (
 )
 
 
+_EXPECTED_COMMANDS = frozenset({
+    "/start", "/help", "/agent", "/sessions", "/kill",
+    "/current", "/switch", "/model", "/param", "/params", "/reset",
+    "/files", "/download", "/cancel", "/name", "/history",
+    "/whoami", "/sudo", "/sysauth", "/memory",
+})
+
+
 class TestCommandRegistry:
 
     def test_all_expected_commands_registered(self):
         """Verify the command registry contains all gateway commands."""
-        from core.command_registry import registry
-
-        expected = {
-            "/start", "/help", "/agent", "/sessions", "/kill",
-            "/current", "/switch", "/model", "/param", "/params", "/reset",
-            "/files", "/download", "/cancel", "/name", "/history",
-            "/whoami", "/sudo", "/sysauth", "/memory",
-        }
         registered = {spec.name for spec in registry.list_all()}
-        assert registered == expected
+        assert registered == _EXPECTED_COMMANDS
 
     def test_every_command_has_description(self):
         """Every registered command must have a non-empty description."""
-        from core.command_registry import registry
-
         for spec in registry.list_all():
             assert spec.description, f"Command {spec.name} has no description"
 
     def test_every_command_has_callable_handler(self):
         """Every registered command must have a callable handler."""
-        from core.command_registry import registry
-
         for spec in registry.list_all():
             assert callable(spec.handler), f"Command {spec.name} handler is not callable"
 
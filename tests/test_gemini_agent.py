@@ -1,26 +1,21 @@
 """Tests for agents/gemini_cli.py — GeminiAgent."""
 
 import asyncio
-from unittest.mock import AsyncMock, patch
+from collections import ChainMap
+from types import MappingProxyType
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 
 from agents.gemini_cli import GeminiAgent
+from tests._matchers import contains_any
 
 
-class FakeRemoteClient:
-    def __init__(self, response: dict):
-        self.response = dict(response)
-        self.calls = []
-
-    async def execute(self, user_id: str, action: dict, grant_token: str = None):
-        self.calls.append({"user_id": str(user_id), "action": dict(action or {})})
-        return dict(self.response)
-
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gemini_config():
-    return {
+    """Read-only agent config; tests that need overrides layer them with ChainMap."""
+    return MappingProxyType({
         "command": "gemini",
         "args_template": ["-p", "{prompt}", "--session-id", "{session_id}"],
         "models": {"gemini3": "gemini-3.0"},
@@ -28,32 +23,46 @@ def gemini_config():
         "supported_params": {"model": "--model", "temperature": "--temperature"},
         "default_params": {},
         "timeout": 5,
-    }
+    })
+
 
+@pytest.fixture(scope="module")
+def agent(tmp_path_factory, gemini_config):
+    """One agent per module; tests that need a clean agent build their own."""
+    return GeminiAgent("gemini", gemini_config, tmp_path_factory.mktemp("gemini"))
 
-@pytest.fixture
-def agent(tmp_path, gemini_config):
-    return GeminiAgent("gemini", gemini_config, tmp_path)
+
+@pytest_asyncio.fixture
+async def session(agent):
+    info = await agent.create_session("u1", "c1")
+    yield info
+    agent.sessions.pop(info.session_id, None)
 
 
 def _make_streaming_process(lines: list[bytes], returncode: int = 0):
-    proc = AsyncMock()
-    proc.returncode = returncode
-    line_iter = iter(lines + [b""])
-    async def readline():
-        return next(line_iter)
-    proc.stdout = AsyncMock()
-    proc.stdout.readline = readline
-    proc.stderr = AsyncMock()
-    proc.stderr.read = AsyncMock(return_value=b"")
+    # Fresh mock per call: only wait/kill (and stderr.read) are awaited.
+    proc = MagicMock()
     proc.wait = AsyncMock()
     proc.kill = AsyncMock()
+    proc.returncode = returncode
+    proc.stdout = MagicMock()
+    if not lines:
+        proc.stdout.readline = AsyncMock(return_value=b"")
+    else:
+        frames = (*lines, b"")
+        proc._idx = 0
+        async def readline():
+            i = proc._idx
+            proc._idx = i + 1
+            return frames[i] if i < len(frames) else b""
+        proc.stdout.readline = readline
+    proc.stderr = MagicMock()
+    proc.stderr.read = AsyncMock(return_value=b"")
     return proc
 
 
 class TestCreateSession:
 
-    @pytest.mark.asyncio
     async def test_create_session(self, agent):
         info = await agent.create_session("u1", "c1")
         assert info.agent_name == "gemini"
@@ -63,32 +72,22 @@ class TestCreateSession:
 
 class TestSendMessage:
 
-    @pytest.mark.asyncio
-    async def test_send_message_streaming(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_send_message_streaming(self, agent, session, patched_exec):
         mock_proc = _make_streaming_process([b"hello\n", b"world\n"], returncode=0)
         mock_proc.returncode = 0
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_proc):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
+        patched_exec.set_proc(mock_proc)
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
         assert len(chunks) >= 2
 
-    @pytest.mark.asyncio
-    async def test_send_message_command_not_found(self, agent):
-        session = await agent.create_session("u1", "c1")
-        with patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError()):
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test"):
-                chunks.append(chunk)
-            assert any("未安装" in c or "未找到" in c for c in chunks)
-
-    @pytest.mark.asyncio
-    async def test_send_message_system_sudo_sets_approval_mode_yolo_and_disables_sandbox(self, tmp_path, gemini_config):
-        cfg = dict(gemini_config)
-        cfg["args_template"] = ["-p", "{prompt}", "--approval-mode", "default", "--yolo", "--sandbox=true"]
-        remote = FakeRemoteClient({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
+    async def test_send_message_command_not_found(self, agent, session, patched_exec):
+        patched_exec.set_exc(FileNotFoundError())
+        chunks = [c async for c in agent.send_message(session.session_id, "test")]
+        assert any(contains_any(c, "未安装", "未找到") for c in chunks)
+
+    async def test_send_message_system_sudo_sets_approval_mode_yolo_and_disables_sandbox(self, tmp_path, gemini_config, fake_remote_factory, patched_exec):
+        cfg = ChainMap({"args_template": ["-p", "{prompt}", "--approval-mode", "default", "--yolo", "--sandbox=true"]}, gemini_config)
+        remote = fake_remote_factory({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
         agent = GeminiAgent(
             "gemini",
             cfg,
@@ -99,13 +98,10 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test", run_as_root=True):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test", run_as_root=True)]
 
-        assert "remote-ok" in "".join(chunks)
-        assert not mock_exec.called
+        assert any("remote-ok" in c for c in chunks)
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--approval-mode=yolo" in action["args"]
         assert "--approval-mode" not in action["args"]
@@ -114,11 +110,9 @@ class TestSendMessage:
         assert "--sandbox=false" in action["args"]
         assert "--sandbox=true" not in action["args"]
 
-    @pytest.mark.asyncio
-    async def test_send_message_system_without_sudo_keeps_default_approval_mode(self, tmp_path, gemini_config):
-        cfg = dict(gemini_config)
-        cfg["args_template"] = ["-p", "{prompt}", "--approval-mode", "default", "--sandbox=true"]
-        remote = FakeRemoteClient({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
+    async def test_send_message_system_without_sudo_keeps_default_approval_mode(self, tmp_path, gemini_config, fake_remote_factory, patched_exec):
+        cfg = ChainMap({"args_template": ["-p", "{prompt}", "--approval-mode", "default", "--sandbox=true"]}, gemini_config)
+        remote = fake_remote_factory({"ok": True, "returncode": 0, "stdout": "remote-ok", "stderr": ""})
         agent = GeminiAgent(
             "gemini",
             cfg,
@@ -129,13 +123,10 @@ class TestSendMessage:
         )
         session = await agent.create_session("u1", "c1")
 
-        with patch("asyncio.create_subprocess_exec") as mock_exec:
-            chunks = []
-            async for chunk in agent.send_message(session.session_id, "test", run_as_root=False):
-                chunks.append(chunk)
+        chunks = [c async for c in agent.send_message(session.session_id, "test", run_as_root=False)]
 
-        assert "remote-ok" in "".join(chunks)
-        assert not mock_exec.called
+        assert any("remote-ok" in c for c in chunks)
+        assert not patched_exec
         action = remote.calls[0]["action"]
         assert "--approval-mode" in action["args"]
         idx = action["args"].index("--approval-mode")
@@ -147,18 +138,14 @@ class TestSendMessage:
 
 class TestDestroySession:
 
-    @pytest.mark.asyncio
-    async def test_destroy_session(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_destroy_session(self, agent, session):
         await agent.destroy_session(session.session_id)
         assert session.session_id not in agent.sessions
 
 
 class TestHealthCheck:
 
-    @pytest.mark.asyncio
-    async def test_health_check(self, agent):
-        session = await agent.create_session("u1", "c1")
+    async def test_health_check(self, agent, session):
         h = agent.health_check(session.session_id)
         assert h["alive"] is True
         assert h["busy"] is False
@@ -1,17 +1,25 @@
 """Tests for utils/helpers.py — utility functions."""
 
 import os
+import re
+
 import pytest
 
-from utils.helpers import load_config, sanitize_session_id, truncate_text
+from utils.helpers import _strip_html_tags, load_config, sanitize_session_id, truncate_text
+
+
+@pytest.fixture(scope="session")
+def basic_config_path(tmp_path_factory):
+    """Env-free config written once; only for tests that read it without modifying the file."""
+    cfg = tmp_path_factory.mktemp("config") / "config.yaml"
+    cfg.write_text("key: value\nnested:\n  a: 1\n", encoding="utf-8")
+    return str(cfg)
 
 
 class TestLoadConfig:
 
-    def test_load_config_basic(self, tmp_path):
-        cfg = tmp_path / "config.yaml"
-        cfg.write_text("key: value\nnested:\n  a: 1\n", encoding="utf-8")
-        result = load_config(str(cfg))
+    def test_load_config_basic(self, basic_config_path):
+        result = load_config(basic_config_path)
         assert result["key"] == "value"
         assert result["nested"]["a"] == 1
 
@@ -29,6 +37,46 @@ class TestLoadConfig:
         with pytest.raises(ValueError, match="MISSING_VAR_XYZ"):
             load_config(str(cfg))
 
+    def test_load_config_returns_independent_copies(self, basic_config_path):
+        first = load_config(basic_config_path)
+        first["nested"]["a"] = 2
+        assert load_config(basic_config_path)["nested"]["a"] == 1
+
+    def test_load_config_picks_up_file_changes(self, tmp_path):
+        cfg = tmp_path / "config.yaml"
+        cfg.write_text("key: old\n", encoding="utf-8")
+        assert load_config(str(cfg))["key"] == "old"
+        cfg.write_text("key: newer\n", encoding="utf-8")
+        assert load_config(str(cfg))["key"] == "newer"
+
+    def test_load_config_picks_up_same_size_edit_with_reset_mtime(self, tmp_path):
+        cfg = tmp_path / "config.yaml"
+        cfg.write_text("key: aaa\n", encoding="utf-8")
+        st = os.stat(cfg)
+        assert load_config(str(cfg))["key"] == "aaa"
+        cfg.write_text("key: bbb\n", encoding="utf-8")
+        os.utime(cfg, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert load_config(str(cfg))["key"] == "bbb"
+
+    def test_load_config_picks_up_atomic_replace_with_reset_mtime(self, tmp_path):
+        cfg = tmp_path / "config.yaml"
+        cfg.write_text("key: aaa\n", encoding="utf-8")
+        st = os.stat(cfg)
+        assert load_config(str(cfg))["key"] == "aaa"
+        replacement = tmp_path / "config.yaml.new"
+        replacement.write_text("key: ccc\n", encoding="utf-8")
+        os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(replacement, cfg)
+        assert load_config(str(cfg))["key"] == "ccc"
+
+    def test_load_config_picks_up_env_changes(self, tmp_path, monkeypatch):
+        cfg = tmp_path / "config.yaml"
+        cfg.write_text("token: ${TEST_TOKEN}\n", encoding="utf-8")
+        monkeypatch.setenv("TEST_TOKEN", "one")
+        assert load_config(str(cfg))["token"] == "one"
+        monkeypatch.setenv("TEST_TOKEN", "two")
+        assert load_config(str(cfg))["token"] == "two"
+
     def test_load_config_file_not_found(self):
         with pytest.raises(FileNotFoundError):
             load_config("/nonexistent/config.yaml")
@@ -51,6 +99,10 @@ class TestSanitizeSessionId:
         with pytest.raises(ValueError):
             sanitize_session_id("../../../")
 
+    def test_sanitize_rejects_trailing_newline(self):
+        with pytest.raises(ValueError):
+            sanitize_session_id("abcd1234\n")
+
 
 class TestTruncateText:
 
@@ -69,6 +121,17 @@ class TestTruncateText:
         assert "<b>" not in result  # HTML stripped before truncation
         assert len(result) <= 53
 
+    @pytest.mark.parametrize("text", [
+        "<b>bold</b> plain",
+        "a <> b < c",
+        "<a<b>c>d",
+        "x < y > z",
+        "trailing <open",
+        "<<>>",
+    ])
+    def test_strip_html_tags_matches_regex(self, text):
+        assert _strip_html_tags(text) == re.sub(r'<[^>]+>', '', text)
+
     def test_truncate_with_markdown(self):
         text = "**bold** and _italic_ " * 20
         result = truncate_text(text, 50)
@@ -4,6 +4,7 @@ import asyncio
 import pytest
 
 from channels.base import IncomingMessage
+from tests._matchers import contains_any
 
 
 class TestCancelCommand:
@@ -13,7 +14,7 @@ class TestCancelCommand:
     async def test_cancel_no_session(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/cancel"))
         text = fake_channel.last_sent_text()
-        assert "无活跃" in text or "❌" in text
+        assert contains_any(text, "无活跃", "❌")
 
     @pytest.mark.asyncio
     async def test_cancel_not_busy(self, router, make_message, fake_channel, mock_agent):
@@ -21,7 +22,7 @@ class TestCancelCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/cancel"))
         text = fake_channel.last_sent_text()
-        assert "没有正在执行" in text or "无任务" in text or "当前无" in text
+        assert contains_any(text, "没有正在执行", "无任务", "当前无")
 
     @pytest.mark.asyncio
     async def test_cancel_busy_session(self, router, make_message, fake_channel, mock_agent):
@@ -33,4 +34,4 @@ class TestCancelCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/cancel"))
         text = fake_channel.last_sent_text()
-        assert "取消" in text or "✅" in text
+        assert contains_any(text, "取消", "✅")
@@ -2,7 +2,8 @@
 
 import pytest
 
-from channels.base import IncomingMessage
+from core.router import Router
+from tests._matchers import contains_any
 
 
 class TestUserFriendlyErrors:
@@ -10,16 +11,10 @@ class TestUserFriendlyErrors:
 
     @pytest.mark.asyncio
     async def test_no_python_traceback_in_output(
-        self, auth, session_manager, sample_config, billing, mock_agent, fake_channel
+        self, auth, session_manager, sample_config, billing, mock_agent, fake_channel, make_message, make_failing_send
     ):
         """Errors should never expose Python tracebacks to users."""
-        from core.router import Router
-        async def _raise_error(session_id, message, model=None, params=None):
-            if False:
-                yield ""  # keep async-generator shape expected by router
-            raise Exception("Internal error: DB connection pool exhausted at line 42")
-
-        mock_agent.send_message = _raise_error
+        mock_agent.send_message = make_failing_send(Exception("Internal error: DB connection pool exhausted at line 42"))
         r = Router(
             auth=auth,
             session_manager=session_manager,
@@ -29,10 +24,7 @@ class TestUserFriendlyErrors:
             billing=billing,
         )
 
-        msg = IncomingMessage(
-            channel="telegram", chat_id="c1", user_id="123",
-            text="trigger error", is_private=True, is_reply_to_bot=False, is_mention_bot=False,
-        )
+        msg = make_message(text="trigger error", chat_id="c1")
         await r.handle_message(msg)
         texts = [t for _, t in fake_channel.sent]
         combined = " ".join(texts)
@@ -41,7 +33,7 @@ class TestUserFriendlyErrors:
         assert "DB connection" not in combined
         assert "Traceback" not in combined
         # Should contain user-friendly indicator
-        assert "❌" in combined or "错误" in combined or "失败" in combined
+        assert contains_any(combined, "❌", "错误", "失败")
 
     @pytest.mark.asyncio
     async def test_agent_not_found_error(self, router, make_message, fake_channel, mock_agent):
@@ -53,4 +45,4 @@ class TestUserFriendlyErrors:
         await router.handle_message(make_message(text="second"))
         text = fake_channel.last_sent_text()
         assert "❌" in text
-        assert "Agent" in text or "agent" in text
+        assert contains_any(text, "Agent", "agent")
@@ -4,6 +4,7 @@ import pytest
 from pathlib import Path
 
 from channels.base import IncomingMessage
+from tests._matchers import contains_any
 
 
 class TestFilesCommand:
@@ -13,7 +14,7 @@ class TestFilesCommand:
     async def test_files_no_session(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/files"))
         text = fake_channel.last_sent_text()
-        assert "无活跃" in text or "❌" in text
+        assert contains_any(text, "无活跃", "❌")
 
     @pytest.mark.asyncio
     async def test_files_empty_workspace(self, router, make_message, fake_channel, mock_agent):
@@ -22,7 +23,7 @@ class TestFilesCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/files"))
         text = fake_channel.last_sent_text()
-        assert "暂无" in text or "空" in text or "没有" in text
+        assert contains_any(text, "暂无", "空", "没有")
 
     @pytest.mark.asyncio
     async def test_files_lists_files(self, router, make_message, fake_channel, mock_agent):
@@ -39,6 +40,24 @@ class TestFilesCommand:
         assert "result.py" in text
         assert "report.md" in text
 
+    @pytest.mark.asyncio
+    async def test_files_listing_is_capped(self, router, make_message, fake_channel, mock_agent):
+        await router.handle_message(make_message(text="hello"))
+        sid = mock_agent.created_sessions[0]
+        ai_dir = mock_agent.sessions[sid].ai_dir
+        for i in range(105):
+            (ai_dir / f"out_{i:03d}.txt").write_text("x")
+        (ai_dir / "subdir").mkdir()
+
+        fake_channel.sent.clear()
+        await router.handle_message(make_message(text="/files"))
+        text = fake_channel.last_sent_text()
+        assert "out_000.txt" in text
+        assert "out_099.txt" in text
+        assert "out_100.txt" not in text
+        assert "另有 5 个文件" in text
+        assert "subdir" not in text
+
 
 class TestDownloadCommand:
     """The /download <filename> command sends a file from the ai/ directory."""
@@ -47,7 +66,7 @@ class TestDownloadCommand:
     async def test_download_no_session(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/download test.py"))
         text = fake_channel.last_sent_text()
-        assert "无活跃" in text or "❌" in text
+        assert contains_any(text, "无活跃", "❌")
 
     @pytest.mark.asyncio
     async def test_download_no_arg(self, router, make_message, fake_channel, mock_agent):
@@ -55,7 +74,7 @@ class TestDownloadCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/download"))
         text = fake_channel.last_sent_text()
-        assert "用法" in text or "filename" in text.lower()
+        assert contains_any(text.lower(), "用法", "filename")
 
     @pytest.mark.asyncio
     async def test_download_file_not_found(self, router, make_message, fake_channel, mock_agent):
@@ -63,7 +82,7 @@ class TestDownloadCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/download nonexistent.txt"))
         text = fake_channel.last_sent_text()
-        assert "未找到" in text or "不存在" in text or "❌" in text
+        assert contains_any(text, "未找到", "不存在", "❌")
 
     @pytest.mark.asyncio
     async def test_download_success(self, router, make_message, fake_channel, mock_agent):
@@ -85,4 +104,4 @@ class TestDownloadCommand:
         fake_channel.sent.clear()
         await router.handle_message(make_message(text="/download ../../../etc/passwd"))
         text = fake_channel.last_sent_text()
-        assert "❌" in text or "非法" in text or "未找到" in text
+        assert contains_any(text, "❌", "非法", "未找到")
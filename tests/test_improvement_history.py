@@ -2,6 +2,8 @@
 
 import pytest
 
+from tests._matchers import contains_any
+
 
 class TestHistoryCommand:
     """/history shows recent interactions for the current session."""
@@ -10,14 +12,14 @@ class TestHistoryCommand:
     async def test_history_no_session(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/history"))
         text = fake_channel.last_sent_text()
-        assert "无活跃" in text or "❌" in text
+        assert contains_any(text, "无活跃", "❌")
 
     @pytest.mark.asyncio
     async def test_history_empty(self, router, make_message, fake_channel, session_manager):
         session_manager.create_session("123", "chat_1", "claude", session_id="s1")
         await router.handle_message(make_message(text="/history"))
         text = fake_channel.last_sent_text()
-        assert "暂无" in text or "空" in text or "没有" in text
+        assert contains_any(text, "暂无", "空", "没有")
 
     @pytest.mark.asyncio
     async def test_history_shows_entries(self, router, make_message, fake_channel, mock_agent):
@@ -27,7 +29,7 @@ class TestHistoryCommand:
         await router.handle_message(make_message(text="/history"))
         text = fake_channel.last_sent_text()
         # Should contain the previous prompt
-        assert "python" in text.lower() or "历史" in text
+        assert contains_any(text.lower(), "python", "历史")
 
 
 class TestHistoryRecording:
@@ -4,6 +4,7 @@ import asyncio
 import pytest
 
 from channels.base import IncomingMessage
+from tests._matchers import contains_any
 
 
 class TestMessageQueuing:
@@ -23,7 +24,7 @@ class TestMessageQueuing:
         await router.handle_message(make_message(text="queued message"))
         text = fake_channel.last_sent_text()
         # Should indicate busy / try later
-        assert "处理中" in text or "稍后" in text
+        assert contains_any(text, "处理中", "稍后")
 
         router._session_locks[sid].release()
 
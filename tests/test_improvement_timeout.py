@@ -1,19 +1,18 @@
 """Tests for Improvement 6: Partial result preservation on timeout."""
 
 import asyncio
-import json
-from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from agents.claude_code import ClaudeCodeAgent
+from tests._matchers import contains_any
 
 
 class TestPartialResultOnTimeout:
     """When a timeout occurs, already-collected output should be returned."""
 
     @pytest.mark.asyncio
-    async def test_timeout_returns_partial(self, tmp_path):
+    async def test_timeout_returns_partial(self, tmp_path, fake_proc_factory, patched_exec):
         config = {
             "command": "claude",
             "args_template": ["-p", "{prompt}", "--session-id", "{session_id}", "--output-format", "text"],
@@ -25,24 +24,19 @@ class TestPartialResultOnTimeout:
         agent = ClaudeCodeAgent("claude", config, tmp_path)
         session = await agent.create_session("u1", "c1")
 
-        # Mock process that takes too long
-        proc = AsyncMock()
-        proc.returncode = None
+        # Process that never finishes on its own: communicate() blocks on an
+        # event (no 10s timer) until the agent's 1s timeout cancels it.
+        done = asyncio.Event()
+        patched_exec.set_proc(fake_proc_factory(stdout=b"full output", returncode=None, delay_event=done))
 
-        async def slow_communicate():
-            await asyncio.sleep(10)
-            return (b"full output", b"")
-
-        proc.communicate = slow_communicate
-        proc.kill = AsyncMock()
-        proc.wait = AsyncMock()
-
-        with patch("asyncio.create_subprocess_exec", return_value=proc):
+        try:
             chunks = []
             async for chunk in agent.send_message(session.session_id, "test"):
                 chunks.append(chunk)
+        finally:
+            done.set()
 
         text = "".join(chunks)
         # Should mention timeout AND provide partial info
         assert "超时" in text
-        assert "不完整" in text or "部分" in text or "partial" in text.lower() or "超时" in text
+        assert contains_any(text.lower(), "不完整", "部分", "partial", "超时")
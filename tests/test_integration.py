@@ -1,8 +1,8 @@
 """End-to-end integration tests."""
 
-import pytest
+import asyncio
 
-from channels.base import IncomingMessage
+import pytest
 
 
 class TestFullWorkflow:
@@ -87,7 +87,7 @@ class TestMultipleUsersIsolation:
 
     @pytest.mark.asyncio
     async def test_multiple_users(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel
+        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel, make_message
     ):
         from core.router import Router
 
@@ -101,17 +101,10 @@ class TestMultipleUsersIsolation:
             billing=billing,
         )
 
-        msg1 = IncomingMessage(
-            channel="telegram", chat_id="c1", user_id="123",
-            text="hello from user 1", is_private=True, is_reply_to_bot=False, is_mention_bot=False,
-        )
-        msg2 = IncomingMessage(
-            channel="telegram", chat_id="c2", user_id="u2",
-            text="hello from user 2", is_private=True, is_reply_to_bot=False, is_mention_bot=False,
-        )
+        msg1 = make_message(chat_id="c1", user_id="123", text="hello from user 1")
+        msg2 = make_message(chat_id="c2", user_id="u2", text="hello from user 2")
 
-        await r.handle_message(msg1)
-        await r.handle_message(msg2)
+        await asyncio.gather(r.handle_message(msg1), r.handle_message(msg2))
 
         s1 = session_manager.get_active_session("123")
         s2 = session_manager.get_active_session("u2")
@@ -124,7 +117,7 @@ class TestSessionPersistenceIntegration:
 
     @pytest.mark.asyncio
     async def test_persistence(
-        self, auth, mock_agent, sample_config, billing, tmp_workspace, fake_channel
+        self, auth, mock_agent, sample_config, billing, tmp_workspace, fake_channel, make_message
     ):
         from core.router import Router
         from core.session import SessionManager
@@ -140,10 +133,7 @@ class TestSessionPersistenceIntegration:
         )
 
         # Create session via message
-        msg = IncomingMessage(
-            channel="telegram", chat_id="c1", user_id="123",
-            text="persistent message", is_private=True, is_reply_to_bot=False, is_mention_bot=False,
-        )
+        msg = make_message(chat_id="c1", user_id="123", text="persistent message")
         await r1.handle_message(msg)
         active_sid = sm1.get_active_session("123").session_id
 
@@ -1,13 +1,17 @@
 """
 多 Agent 集成测试
 模拟用户在 Claude、Codex、Gemini 之间切换
+
+脱离 pytest 直接运行（在仓库根目录）：python -m tests.test_integration_multiagent
 """
 import asyncio
+import copy
+import os
 import sys
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
-from unittest.mock import MagicMock
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from typing import Optional
 
 from core.router import Router
 from core.session import SessionManager
@@ -17,6 +21,44 @@ from agents.codex_cli import CodexAgent
 from agents.gemini_cli import GeminiAgent
 from channels.base import IncomingMessage
 
+
+@dataclass(slots=True)
+class _SessionInfo:
+    """Router 只读取 session_id / work_dir / is_busy"""
+    session_id: str
+    work_dir: Optional[Path] = None
+    is_busy: bool = False
+
+
+_EXISTING_SESSION = _SessionInfo("")
+
+
+# 三个 agent 的配置；temperature 在 Codex / Gemini 下映射到不同 CLI 标志
+_AGENT_CONFIGS = {
+    "claude": {
+        "command": "claude",
+        "models": {"sonnet": "claude-sonnet-4-5", "opus": "claude-opus-4-6"},
+        "default_model": "sonnet",
+        "supported_params": {"thinking": "--thinking"},
+        "default_params": {"thinking": "low"}
+    },
+    "codex": {
+        "command": "codex",
+        "models": {"gpt5.3": "gpt-5.3-codex"},
+        "default_model": "gpt5.3",
+        "supported_params": {"temperature": "--temperature", "max_tokens": "--max-tokens"},
+        "default_params": {}
+    },
+    "gemini": {
+        "command": "gemini-cli",
+        "models": {"gemini3": "gemini-3-pro-preview"},
+        "default_model": "gemini3",
+        "supported_params": {"temperature": "--temp"},
+        "default_params": {}
+    }
+}
+
+
 class MockAgentForIntegration:
     """模拟 Agent（继承真实 Agent 的接口）"""
     def __init__(self, name, config, workspace_base):
@@ -37,14 +79,11 @@ class MockAgentForIntegration:
             "agent_name": self.name,
             "work_dir": str(work_dir),
         }
-        session_info = MagicMock()
-        session_info.session_id = session_id
-        session_info.work_dir = work_dir
-        return session_info
+        return _SessionInfo(session_id, work_dir)
     
     def get_session_info(self, session_id):
         if session_id in self.sessions:
-            return MagicMock()
+            return _EXISTING_SESSION
         return None
     
     async def send_message(self, session_id, message, model=None, params=None, run_as_root=False):
@@ -61,12 +100,19 @@ class FakeChannel:
     """模拟 Channel"""
     def __init__(self):
         self.messages = []
+        # TEST_QUIET=0 打印每条消息，便于手动排查
+        self.quiet = os.environ.get("TEST_QUIET", "1") == "1"
+    
+    def _echo(self, header, text):
+        if self.quiet:
+            return
+        print(header)
+        print(text if len(text) <= 200 else f"{text[:200]}...")
+        print("-" * 80)
     
     async def send_text(self, chat_id, text):
         self.messages.append(("send", text))
-        print(f"\n[Bot → {chat_id}]")
-        print(text[:200] + "..." if len(text) > 200 else text)
-        print("-" * 80)
+        self._echo(f"\n[Bot → {chat_id}]", text)
         return len(self.messages)
     
     async def send_typing(self, chat_id):
@@ -74,47 +120,25 @@ class FakeChannel:
     
     async def edit_message(self, chat_id, message_id, text):
         self.messages.append(("edit", text))
-        print(f"\n[Bot → {chat_id}] (edited)")
-        print(text[:200] + "..." if len(text) > 200 else text)
-        print("-" * 80)
+        self._echo(f"\n[Bot → {chat_id}] (edited)", text)
 
 async def test_multi_agent_workflow():
     """测试多 Agent 工作流"""
+    # 每次运行使用全新的工作区，避免历史会话堆积
+    with tempfile.TemporaryDirectory(prefix="integration-test-") as td:
+        await _run_multi_agent_workflow(Path(td))
+
+
+async def _run_multi_agent_workflow(workspace):
     print("\n" + "="*80)
     print("集成测试：多 Agent 工作流")
     print("="*80)
     
     # 配置
-    config = {
-        "agents": {
-            "claude": {
-                "command": "claude",
-                "models": {"sonnet": "claude-sonnet-4-5", "opus": "claude-opus-4-6"},
-                "default_model": "sonnet",
-                "supported_params": {"thinking": "--thinking"},
-                "default_params": {"thinking": "low"}
-            },
-            "codex": {
-                "command": "codex",
-                "models": {"gpt5.3": "gpt-5.3-codex"},
-                "default_model": "gpt5.3",
-                "supported_params": {"temperature": "--temperature", "max_tokens": "--max-tokens"},
-                "default_params": {}
-            },
-            "gemini": {
-                "command": "gemini-cli",
-                "models": {"gemini3": "gemini-3-pro-preview"},
-                "default_model": "gemini3",
-                "supported_params": {"temperature": "--temp"},
-                "default_params": {}
-            }
-        }
-    }
+    config = {"agents": copy.deepcopy(_AGENT_CONFIGS)}
     
     # 初始化组件
     auth = Auth(channel_allowed={"telegram": ["123"]})
-    workspace = Path("/tmp/integration-test")
-    workspace.mkdir(parents=True, exist_ok=True)
     session_manager = SessionManager(workspace)
     
     agents = {
@@ -153,22 +177,17 @@ async def test_multi_agent_workflow():
         ("kapy agent claude", "切换回 Claude"),
         ("kapy model opus", "切换到 opus"),
         ("kapy param thinking high", "设置高级推理"),
-        ("kapy params", "确认 Claude 新配置"),
         ("complex reasoning task", "用 Claude Opus 推理"),
-        
-        # Scenario 5: 验证 session 隔离
+    ]
+
+    # Scenario 5: 只读验证（互不依赖，可并发执行）
+    read_only_checks = [
+        ("kapy params", "确认 Claude 新配置"),
         ("kapy sessions", "列出所有会话"),
     ]
-    
-    print("\n开始执行测试场景...")
-    
-    for i, (text, description) in enumerate(test_scenarios, 1):
-        print(f"\n{'='*80}")
-        print(f"场景 {i}: {description}")
-        print(f"{'='*80}")
-        print(f"[User → Bot] {text}")
-        
-        msg = IncomingMessage(
+
+    def make_msg(text):
+        return IncomingMessage(
             channel="telegram",
             chat_id=chat_id,
             user_id=user_id,
@@ -178,16 +197,28 @@ async def test_multi_agent_workflow():
             is_mention_bot=False,
             attachments=[]
         )
-        
-        try:
+
+    transcript = []
+    # 场景全部来自同一用户、会改状态：任务按创建顺序排队拿锁，保证串行
+    user_lock = asyncio.Lock()
+
+    async def dispatch(msg):
+        async with user_lock:
             await router.handle_message(msg)
-            await asyncio.sleep(0.1)
-        except Exception as e:
-            print(f"❌ ERROR: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-    
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i, (text, description) in enumerate(test_scenarios, 1):
+                transcript.append(f"场景 {i}: {description}\n[User → Bot] {text}")
+                tg.create_task(dispatch(make_msg(text)))
+
+        for text, description in read_only_checks:
+            transcript.append(f"只读验证: {description}\n[User → Bot] {text}")
+        await asyncio.gather(*[router.handle_message(make_msg(text)) for text, _ in read_only_checks])
+    finally:
+        # 出错时也输出已执行的场景，便于定位
+        print("\n".join(transcript))
+
     # 验证会话状态
     print("\n" + "="*80)
     print("验证最终状态")
@@ -204,56 +235,25 @@ async def test_multi_agent_workflow():
     
     # 验证当前会话是 Claude + opus + thinking=high
     current = session_manager.get_active_session(user_id)
-    
-    checks = [
-        (current.agent_name == "claude", f"当前 agent 应为 claude，实际为 {current.agent_name}"),
-        (current.model == "opus", f"当前模型应为 opus，实际为 {current.model}"),
-        (current.params.get("thinking") == "high", f"thinking 应为 high，实际为 {current.params.get('thinking')}"),
-    ]
-    
-    all_passed = True
-    for check, error_msg in checks:
-        if not check:
-            print(f"\n❌ 验证失败: {error_msg}")
-            all_passed = False
-    
-    if all_passed:
-        print("\n✅ 所有验证通过")
-        return True
-    else:
-        return False
+    assert current is not None, "应存在活跃会话"
+    assert current.agent_name == "claude", f"当前 agent 应为 claude，实际为 {current.agent_name}"
+    assert current.model == "opus", f"当前模型应为 opus，实际为 {current.model}"
+    assert current.params.get("thinking") == "high", f"thinking 应为 high，实际为 {current.params.get('thinking')}"
+    print("\n✅ 所有验证通过")
 
-async def test_parameter_format_conversion():
-    """测试参数格式自动转换"""
-    print("\n" + "="*80)
-    print("集成测试：参数格式自动转换")
-    print("="*80)
-    
-    # 三个 agent 使用相同的参数名 "temperature"，但 CLI 标志不同
-    configs = {
-        "codex": {
-            "supported_params": {"temperature": "--temperature"}
-        },
-        "gemini": {
-            "supported_params": {"temperature": "--temp"}
-        }
-    }
-    
-    # 验证配置差异
-    codex_flag = configs["codex"]["supported_params"]["temperature"]
-    gemini_flag = configs["gemini"]["supported_params"]["temperature"]
-    
-    print(f"\n参数名: temperature")
-    print(f"  Codex CLI 标志: {codex_flag}")
-    print(f"  Gemini CLI 标志: {gemini_flag}")
-    
-    if codex_flag != gemini_flag:
-        print("\n✅ 参数格式不同，需要自动转换")
-        print("✅ Gateway 会根据当前 agent 自动选择正确格式")
-        return True
-    else:
-        print("\n❌ 参数格式应该不同")
-        return False
+def test_parameter_format_conversion():
+    """同名参数 temperature 在 Codex / Gemini 下对应不同 CLI 标志"""
+    params = {"temperature": "0.7"}
+    with tempfile.TemporaryDirectory(prefix="integration-test-") as td:
+        codex = CodexAgent("codex", copy.deepcopy(_AGENT_CONFIGS["codex"]), Path(td) / "codex")
+        gemini = GeminiAgent("gemini", copy.deepcopy(_AGENT_CONFIGS["gemini"]), Path(td) / "gemini")
+        codex_args = codex._build_args("hi", "sid", params=params)
+        gemini_args = gemini._build_args("hi", "sid", params=params)
+
+    assert codex_args[codex_args.index("--temperature") + 1] == "0.7"
+    assert "--temp" not in codex_args
+    assert gemini_args[gemini_args.index("--temp") + 1] == "0.7"
+    assert "--temperature" not in gemini_args
 
 async def main():
     """运行集成测试"""
@@ -270,8 +270,12 @@ async def main():
     
     for name, test_func in tests:
         try:
-            result = await test_func()
-            results.append((name, result))
+            if asyncio.iscoroutinefunction(test_func):
+                await test_func()
+            else:
+                test_func()
+            # 测试以断言/异常表达失败，正常返回即视为通过
+            results.append((name, True))
         except Exception as e:
             print(f"\n❌ 测试失败: {name}")
             print(f"Exception: {e}")
@@ -7,8 +7,6 @@ from typing import Optional
 
 import pytest
 
-from core.router import Router
-
 
 @dataclass
 class _FakeRow:
@@ -26,6 +24,10 @@ class _FakeRow:
     content: str = "full content"
 
 
+# Rows that do not depend on call arguments are built once and shared.
+_LIST_ROWS = (_FakeRow(memory_id=1),)
+
+
 class FakeMemoryManager:
     enabled = True
 
@@ -36,7 +38,9 @@ class FakeMemoryManager:
         return {"user_items": 3, "vector_supported": True}
 
     async def list_memories(self, *, user_id: str, tier: Optional[str] = None, limit: int = 20):
-        return [_FakeRow(memory_id=1, tier=tier or "short")]
+        if tier is None or tier == "short":
+            return list(_LIST_ROWS)
+        return [_FakeRow(memory_id=1, tier=tier)]
 
     async def search_memories(self, *, user_id: str, query: str, limit: int = 6, min_score: float = 0.2):
         return [_FakeRow(memory_id=2, tier="mid", summary=f"match:{query}")]
@@ -87,6 +91,14 @@ class FakeMemoryManager:
             type("Ev", (), {"retrieval_id": 101, "result_count": 2, "context_injected": True, "feedback": "good", "query": "deploy"})
         ]
 
+
+class LegacyMemoryManager(FakeMemoryManager):
+    """Backend predating retrieval events: no request ids, no feedback."""
+
+    search_memories_with_event = None
+    record_retrieval_feedback = None
+
+
 class TestMemoryCommand:
     @pytest.mark.asyncio
     async def test_memory_disabled_without_manager(self, router, make_message, fake_channel):
@@ -95,78 +107,54 @@ class TestMemoryCommand:
         assert "未启用" in text
 
     @pytest.mark.asyncio
-    async def test_memory_list(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel, make_message
-    ):
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-            memory_manager=FakeMemoryManager(),
-        )
+    async def test_memory_list(self, router_factory, fake_channel, make_message):
+        r = router_factory(memory_manager=FakeMemoryManager())
         await r.handle_message(make_message(text="/memory list"))
-        assert "记忆列表" in (fake_channel.last_sent_text() or "")
+        text = fake_channel.last_sent_text() or ""
+        assert "记忆列表" in text
 
     @pytest.mark.asyncio
-    async def test_memory_status_shows_user_scoped_count(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel, make_message
-    ):
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-            memory_manager=FakeMemoryManager(),
-        )
+    async def test_memory_status_shows_user_scoped_count(self, router_factory, fake_channel, make_message):
+        r = router_factory(memory_manager=FakeMemoryManager())
         await r.handle_message(make_message(text="/memory"))
         text = fake_channel.last_sent_text() or ""
         assert "my_items" in text
         assert "shared_skills" not in text
 
     @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "fake_mm_cls, expect_request_id",
+        [(FakeMemoryManager, True), (LegacyMemoryManager, False)],
+    )
     async def test_memory_find_and_share_disabled(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel, make_message
+        self, router_factory, fake_channel, make_message, fake_mm_cls, expect_request_id
     ):
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-            memory_manager=FakeMemoryManager(),
-        )
+        r = router_factory(memory_manager=fake_mm_cls())
         await r.handle_message(make_message(text="/memory find deploy"))
         text = fake_channel.last_sent_text() or ""
         assert "检索结果" in text
-        assert "request_id" in text
+        assert ("request_id" in text) is expect_request_id
 
         await r.handle_message(make_message(text="/memory share 1 my_skill"))
-        assert "已禁用" in (fake_channel.last_sent_text() or "")
+        text = fake_channel.last_sent_text() or ""
+        assert "已禁用" in text
 
     @pytest.mark.asyncio
-    async def test_memory_feedback_and_metrics(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel, make_message
-    ):
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-            memory_manager=FakeMemoryManager(),
-        )
+    async def test_memory_feedback_and_metrics(self, router_factory, fake_channel, make_message):
+        r = router_factory(memory_manager=FakeMemoryManager())
         await r.handle_message(make_message(text="/memory fb 101 good useful"))
-        assert "已记录反馈" in (fake_channel.last_sent_text() or "")
+        text = fake_channel.last_sent_text() or ""
+        assert "已记录反馈" in text
 
         await r.handle_message(make_message(text="/memory metrics 7"))
         text = fake_channel.last_sent_text() or ""
         assert "记忆检索指标" in text
         assert "hit_rate" in text
         assert "req#101" in text
+
+    @pytest.mark.asyncio
+    async def test_memory_feedback_unsupported_backend(self, router_factory, fake_channel, make_message):
+        r = router_factory(memory_manager=LegacyMemoryManager())
+        await r.handle_message(make_message(text="/memory fb 101 good"))
+        text = fake_channel.last_sent_text() or ""
+        assert "不支持反馈" in text
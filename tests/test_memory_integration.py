@@ -6,6 +6,8 @@ import pytest
 
 from core.router import Router
 
+_MEM_CONTEXT = "[MEMORY CONTEXT]\n- remembered preference\n[END MEMORY CONTEXT]\n\n"
+
 
 class FakeMemoryRuntime:
     enabled = True
@@ -16,7 +18,7 @@ class FakeMemoryRuntime:
 
     async def build_memory_context(self, *, user_id: str, query: str, **kwargs):
         self.build_calls.append((user_id, query))
-        return "[MEMORY CONTEXT]\n- remembered preference\n[END MEMORY CONTEXT]\n\n"
+        return _MEM_CONTEXT
 
     async def capture_turn(
         self,
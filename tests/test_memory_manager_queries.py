@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Any, List, Optional, Sequence, Tuple
 
+import pytest
+
 from core.memory import MemoryManager
 
 
@@ -54,15 +56,27 @@ class _FakeConn:
         self.commit_count += 1
 
 
-def _build_manager(fake_conn: _FakeConn) -> MemoryManager:
-    mgr = MemoryManager({"enabled": False})
-    mgr._conn = lambda: fake_conn  # type: ignore[method-assign]
-    return mgr
+@pytest.fixture(scope="module")
+def base_manager() -> MemoryManager:
+    return MemoryManager({"enabled": False})
+
+
+@pytest.fixture
+def fake_stack(base_manager, monkeypatch):
+    """Wire a fresh fake cursor into the shared manager for one test."""
+    def _make(
+        fetchall_batches: Optional[Sequence[Sequence[Tuple[Any, ...]]]] = None,
+        fetchone_value: Optional[Tuple[Any, ...]] = None,
+    ) -> Tuple[_FakeCursor, MemoryManager]:
+        cur = _FakeCursor(fetchall_batches=fetchall_batches, fetchone_value=fetchone_value)
+        fake_conn = _FakeConn(cur)
+        monkeypatch.setattr(base_manager, "_conn", lambda: fake_conn)
+        return cur, base_manager
+    return _make
 
 
-def test_search_text_includes_system_owner_scope():
-    cur = _FakeCursor(fetchall_batches=[[], []])
-    mgr = _build_manager(_FakeConn(cur))
+def test_search_text_includes_system_owner_scope(fake_stack):
+    cur, mgr = fake_stack(fetchall_batches=[[], []])
 
     assert mgr._search_text_sync("u-1", "deploy", 5) == []
 
@@ -73,18 +87,16 @@ def test_search_text_includes_system_owner_scope():
     assert second_params == ("u-1", mgr.SYSTEM_OWNER, 5)
 
 
-def test_list_memories_includes_system_owner_scope():
-    cur = _FakeCursor(fetchall_batches=[[]])
-    mgr = _build_manager(_FakeConn(cur))
+def test_list_memories_includes_system_owner_scope(fake_stack):
+    cur, mgr = fake_stack(fetchall_batches=[[]])
 
     assert mgr._list_memories_sync("u-1", None, 20) == []
     assert len(cur.executions) == 1
     assert cur.executions[0][1] == ("u-1", mgr.SYSTEM_OWNER, 20)
 
 
-def test_get_memory_includes_system_owner_scope():
-    cur = _FakeCursor(fetchone_value=None)
-    mgr = _build_manager(_FakeConn(cur))
+def test_get_memory_includes_system_owner_scope(fake_stack):
+    cur, mgr = fake_stack(fetchone_value=None)
 
     assert mgr._get_memory_sync("u-1", 42) is None
     assert len(cur.executions) == 1
@@ -2,24 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
+import dataclasses
 from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import pytest
 
 from core.memory import MemoryManager, MemoryRecord
 
 
-def _row(memory_id: int = 1, *, summary: str = "remembered") -> MemoryRecord:
-    now = datetime.now(timezone.utc)
+# Timestamps are never asserted on; a fixed instant keeps rows deterministic.
+_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _build_row() -> MemoryRecord:
     return MemoryRecord(
-        memory_id=memory_id,
+        memory_id=1,
         owner_user_id="u-1",
         tier="short",
         memory_type="turn",
         domain="engineering",
         topic="memory",
         item="item",
-        summary=summary,
+        summary="remembered",
         content="content",
         importance=0.5,
         confidence=0.8,
@@ -28,20 +35,49 @@ def _row(memory_id: int = 1, *, summary: str = "remembered") -> MemoryRecord:
         skill_name=None,
         access_count=1,
         score=0.42,
-        created_at=now,
-        updated_at=now,
+        created_at=_NOW,
+        updated_at=_NOW,
     )
 
 
-@pytest.mark.asyncio
-async def test_search_memories_with_event_logs_retrieval(monkeypatch):
-    mgr = MemoryManager({"enabled": True})
+_ROW_TEMPLATE = _build_row()
+
+
+def _row(memory_id: int = 1, *, summary: str = "remembered") -> MemoryRecord:
+    return dataclasses.replace(_ROW_TEMPLATE, memory_id=memory_id, summary=summary)
+
+
+@pytest.fixture(scope="module")
+def mgr() -> MemoryManager:
+    # Tests only monkeypatch attributes on the instance; monkeypatch restores them per test.
+    return MemoryManager({"enabled": True})
+
 
+@pytest.fixture
+def patched_mgr(mgr, monkeypatch):
+    """Shared manager with embeddings stubbed out (text search path only).
+
+    The *_sync helpers the tests install are trivial, so asyncio.to_thread
+    runs them inline instead of handing them to the default executor.
+    """
     async def fake_embed(_text: str):
         return None
 
+    async def inline_to_thread(func, /, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(mgr, "_embed", fake_embed)
+    monkeypatch.setattr(asyncio, "to_thread", inline_to_thread)
+    return mgr
+
+
+@pytest.mark.asyncio
+async def test_search_memories_with_event_logs_retrieval(patched_mgr):
+    mgr = patched_mgr
+
     def fake_search_text_with_meta(_user_id: str, _query: str, _limit: int):
-        return ([_row(memory_id=9)], True)
+        # search_memories_with_event only reads .score off the rows it logs.
+        return ([SimpleNamespace(memory_id=9, score=0.42)], True)
 
     captured = {}
 
@@ -49,33 +85,30 @@ async def test_search_memories_with_event_logs_retrieval(monkeypatch):
         captured["args"] = (user_id, session_id, channel, query, result_count, top_score, latency_ms, used_vector, fallback)
         return 77
 
-    monkeypatch.setattr(mgr, "_embed", fake_embed)
-    monkeypatch.setattr(mgr, "_search_text_with_meta_sync", fake_search_text_with_meta)
-    monkeypatch.setattr(mgr, "_log_retrieval_event_sync", fake_log_event)
-
-    rows, retrieval_id = await mgr.search_memories_with_event(
-        user_id="u-1",
-        query="deploy",
-        session_id="s-1",
-        channel="telegram",
-        limit=5,
-    )
+    with patch.multiple(
+        mgr,
+        _search_text_with_meta_sync=fake_search_text_with_meta,
+        _log_retrieval_event_sync=fake_log_event,
+    ):
+        rows, retrieval_id = await mgr.search_memories_with_event(
+            user_id="u-1",
+            query="deploy",
+            session_id="s-1",
+            channel="telegram",
+            limit=5,
+        )
 
     assert retrieval_id == 77
     assert len(rows) == 1
-    args = captured["args"]
-    assert args[0] == "u-1"
-    assert args[1] == "s-1"
-    assert args[2] == "telegram"
-    assert args[3] == "deploy"
-    assert args[4] == 1
-    assert args[5] == pytest.approx(0.42)
-    assert args[7] is False
+    user_id, session_id, channel, query, result_count, top_score, _latency_ms, used_vector, _fallback = captured["args"]
+    assert (user_id, session_id, channel, query, result_count) == ("u-1", "s-1", "telegram", "deploy", 1)
+    assert top_score == pytest.approx(0.42)
+    assert used_vector is False
 
 
 @pytest.mark.asyncio
-async def test_build_memory_context_marks_injection(monkeypatch):
-    mgr = MemoryManager({"enabled": True})
+async def test_build_memory_context_marks_injection(patched_mgr):
+    mgr = patched_mgr
     marks = []
 
     async def fake_search_with_event(**_kwargs):
@@ -85,9 +118,13 @@ async def test_build_memory_context_marks_injection(monkeypatch):
         marks.append((retrieval_id, user_id, injected_count))
         return True
 
-    monkeypatch.setattr(mgr, "search_memories_with_event", fake_search_with_event)
-    monkeypatch.setattr(mgr, "_mark_retrieval_context_injected_sync", fake_mark)
-
-    out = await mgr.build_memory_context(user_id="u-2", query="deploy", session_id="s-2", channel="telegram")
-    assert "[MEMORY CONTEXT]" in out
+    with patch.multiple(
+        mgr,
+        search_memories_with_event=fake_search_with_event,
+        _mark_retrieval_context_injected_sync=fake_mark,
+    ):
+        out = await mgr.build_memory_context(user_id="u-2", query="deploy", session_id="s-2", channel="telegram")
+    # build_memory_context always opens the block with the marker line.
+    assert out.startswith("[MEMORY CONTEXT]\n")
+    assert out.endswith("[END MEMORY CONTEXT]\n\n")
     assert marks == [(55, "u-2", 1)]
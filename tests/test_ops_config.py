@@ -1,34 +1,62 @@
-from utils.ops_config import merge_ops_config
+import copy
+from types import MappingProxyType
 
+import pytest
 
-def _base_config():
-    return {
-        "auth": {
-            "admin_users": [286194552],
-        },
-        "channels": {
-            "telegram": {"enabled": True, "token": "tg-token"},
-            "discord": {"enabled": True, "token": "dc-token"},
-            "email": {"enabled": True, "username": "ops@example.com"},
-        },
-        "agents": {
-            "claude": {"enabled": True},
-        },
-        "session": {
-            "workspace_base": "./workspaces",
-        },
-        "logging": {
-            "file": "./logs/gateway.log",
-            "audit": {"enabled": True, "file": "./logs/audit.log"},
-        },
-        "billing": {
-            "dir": "./data/billing",
-        },
-    }
-
+import utils.ops_config
+from utils.ops_config import merge_ops_config
 
-def test_merge_applies_runtime_health_and_privileged_overlay():
-    base = _base_config()
+# Read-only template; tests mutate their own deep copies.
+_BASE = MappingProxyType({
+    "auth": {
+        "admin_users": [286194552],
+    },
+    "channels": {
+        "telegram": {"enabled": True, "token": "tg-token"},
+        "discord": {"enabled": True, "token": "dc-token"},
+        "email": {"enabled": True, "username": "ops@example.com"},
+    },
+    "agents": {
+        "claude": {"enabled": True},
+    },
+    "session": {
+        "workspace_base": "./workspaces",
+    },
+    "logging": {
+        "file": "./logs/gateway.log",
+        "audit": {"enabled": True, "file": "./logs/audit.log"},
+    },
+    "billing": {
+        "dir": "./data/billing",
+    },
+})
+
+
+@pytest.fixture(scope="module")
+def base_config():
+    """Return a factory handing each caller its own copy of the base config."""
+    # merge_ops_config insists on a real dict, so even read-only callers get a copy.
+    return lambda: copy.deepcopy(dict(_BASE))
+
+
+@pytest.fixture(autouse=True)
+def _fast_totp_secret(monkeypatch):
+    """Skip urandom for secrets whose value no test inspects.
+
+    merged_default is module-scoped, so it is built before this fixture
+    applies and still exercises the real generator.
+    """
+    monkeypatch.setattr(utils.ops_config, "generate_totp_secret", lambda: "A" * 32)
+
+
+@pytest.fixture(scope="module")
+def merged_default(base_config):
+    """One merge of the untouched base config; consumers must only read it."""
+    return merge_ops_config(base_config(), {})
+
+
+def test_merge_applies_runtime_health_and_privileged_overlay(base_config):
+    base = base_config()
     privileged = {
         "system_service": {
             "enabled": True,
@@ -57,36 +85,46 @@ def test_merge_applies_runtime_health_and_privileged_overlay():
     assert out["system_ops"]["max_read_bytes"] == 1024
 
 
-def test_merge_generates_system_admin_totp_secret():
-    base = _base_config()
-    out, meta = merge_ops_config(base, {})
+def test_merge_generates_system_admin_totp_secret(merged_default):
+    out, meta = merged_default
 
     assert out["auth"]["system_admin_users"] == ["286194552"]
+    assert out["two_factor"]["enabled"] is True
     secret = out["two_factor"]["secrets"]["286194552"]
     assert isinstance(secret, str) and len(secret) >= 16
-    assert out["two_factor"]["enabled"] is True
+    assert secret != "A" * 32
     assert meta["generated_secret_users"] == ["286194552"]
 
 
-def test_merge_keeps_existing_system_admin_secret():
-    base = _base_config()
-    base["auth"]["system_admin_users"] = ["42"]
-    base["two_factor"] = {
-        "enabled": True,
-        "secrets": {
-            "42": "ABCDEF234567",
-        },
-    }
+@pytest.mark.parametrize(
+    "uid,existing_secret,expect_generated",
+    [
+        ("42", "ABCDEF234567", False),
+        ("286194552", "BASE32SECRETEXAMPLE", True),
+    ],
+    ids=["existing", "placeholder"],
+)
+def test_merge_system_admin_totp_secret(base_config, uid, existing_secret, expect_generated):
+    base = base_config()
+    base["auth"]["system_admin_users"] = [uid]
+    base["two_factor"] = {"enabled": True, "secrets": {uid: existing_secret}}
 
     out, meta = merge_ops_config(base, {})
 
-    assert out["auth"]["system_admin_users"] == ["42"]
-    assert out["two_factor"]["secrets"]["42"] == "ABCDEF234567"
-    assert meta["generated_secret_users"] == []
-
-
-def test_merge_channel_profile_telegram_only():
-    base = _base_config()
+    assert out["auth"]["system_admin_users"] == [uid]
+    assert out["two_factor"]["enabled"] is True
+    secret = out["two_factor"]["secrets"][uid]
+    if expect_generated:
+        assert isinstance(secret, str) and len(secret) >= 16
+        assert secret != existing_secret
+        assert meta["generated_secret_users"] == [uid]
+    else:
+        assert secret == existing_secret
+        assert meta["generated_secret_users"] == []
+
+
+def test_merge_channel_profile_telegram_only(base_config):
+    base = base_config()
     out, meta = merge_ops_config(base, {}, channel_profile="telegram-only")
 
     assert out["channels"]["telegram"]["enabled"] is True
@@ -99,9 +137,8 @@ def test_merge_channel_profile_telegram_only():
     }
 
 
-def test_merge_default_channel_profile_is_telegram_only():
-    base = _base_config()
-    out, meta = merge_ops_config(base, {})
+def test_merge_default_channel_profile_is_telegram_only(merged_default):
+    out, meta = merged_default
 
     assert out["channels"]["telegram"]["enabled"] is True
     assert out["channels"]["discord"]["enabled"] is False
@@ -109,24 +146,8 @@ def test_merge_default_channel_profile_is_telegram_only():
     assert meta["channel_profile"] == "telegram-only"
 
 
-def test_merge_replaces_placeholder_totp_secret():
-    base = _base_config()
-    base["auth"]["system_admin_users"] = ["286194552"]
-    base["two_factor"] = {
-        "enabled": True,
-        "secrets": {
-            "286194552": "BASE32SECRETEXAMPLE",
-        },
-    }
-
-    out, meta = merge_ops_config(base, {})
-
-    assert out["two_factor"]["secrets"]["286194552"] != "BASE32SECRETEXAMPLE"
-    assert meta["generated_secret_users"] == ["286194552"]
-
-
-def test_merge_prefers_privileged_auth_and_two_factor():
-    base = _base_config()
+def test_merge_prefers_privileged_auth_and_two_factor(base_config):
+    base = base_config()
     base["auth"]["system_admin_users"] = ["1001"]
     base["two_factor"] = {
         "enabled": True,
@@ -153,14 +174,20 @@ def test_merge_prefers_privileged_auth_and_two_factor():
     assert meta["generated_secret_users"] == []
 
 
-def test_merge_keeps_existing_allowed_peer_units():
-    base = _base_config()
-    privileged = {
-        "system_service": {
-            "enabled": True,
-            "allowed_peer_units": ["cli-gateway-system@ops-z.service"],
-        }
-    }
-    out, _meta = merge_ops_config(base, privileged, instance_id="ops-a")
-    assert out["system_service"]["allowed_peer_units"] == ["cli-gateway-system@ops-z.service"]
+@pytest.mark.parametrize(
+    "peer_units,expected",
+    [
+        (None, ["cli-gateway-system@ops-a.service"]),
+        (["cli-gateway-system@ops-z.service"], ["cli-gateway-system@ops-z.service"]),
+    ],
+    ids=["derived", "explicit"],
+)
+def test_merge_allowed_peer_units(base_config, peer_units, expected):
+    service = {"enabled": True}
+    if peer_units is not None:
+        service["allowed_peer_units"] = peer_units
+
+    out, _meta = merge_ops_config(base_config(), {"system_service": service}, instance_id="ops-a")
+
+    assert out["system_service"]["allowed_peer_units"] == expected
     assert out["system_service"]["enforce_peer_unit_allowlist"] is True
@@ -1,47 +1,59 @@
 """Tests for core/router.py — Gateway command handling."""
 
+import asyncio
+
 import pytest
 
 from channels.base import IncomingMessage
-
-
-class TestStartCommand:
-
-    @pytest.mark.asyncio
-    async def test_start_command(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/start"))
+from tests._matchers import contains_any
+
+
+# Commands answered with a single reply and no session state: (text, any of these substrings).
+_SIMPLE_COMMAND_CASES = [
+    ("/start", ("启动", "Gateway")),
+    ("/help", ("命令", "help")),
+    ("/agent", ("agent",)),
+    ("/agent nonexistent", ("❌", "未找到")),
+    ("/sessions", ("暂无",)),
+    ("/switch nonexistent", ("❌", "不存在")),
+    ("/switch", ("用法", "session_id")),
+    ("/kill", ("无活跃", "无")),
+    ("/model", ("sonnet", "opus", "模型")),
+    ("/param", ("❌", "无活跃")),
+    ("/params", ("❌", "无活跃")),
+    ("/reset", ("❌", "无活跃")),
+]
+
+
+class TestSimpleCommands:
+
+    @pytest.mark.parametrize("cmd,expected_any", _SIMPLE_COMMAND_CASES, ids=[c for c, _ in _SIMPLE_COMMAND_CASES])
+    async def test_simple_command(self, router, make_message, fake_channel, cmd, expected_any):
+        await router.handle_message(make_message(text=cmd))
         assert len(fake_channel.sent) == 1
-        assert "启动" in fake_channel.last_sent_text() or "Gateway" in fake_channel.last_sent_text()
+        text = fake_channel.last_sent_text().lower()
+        assert any(tok.lower() in text for tok in expected_any)
 
 
 class TestHelpCommand:
 
-    @pytest.mark.asyncio
-    async def test_help_command(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/help"))
+    @pytest.mark.parametrize("text", ["/help@gateway_bot", "/HELP extra args", "/help\nmore lines"])
+    async def test_help_command_token_forms(self, router, make_message, fake_channel, mock_agent, text):
+        await router.handle_message(make_message(text=text))
         assert len(fake_channel.sent) == 1
-        text = fake_channel.last_sent_text()
-        assert "命令" in text or "help" in text.lower()
+        assert mock_agent.messages_received == []
 
 
 class TestAgentCommand:
 
-    @pytest.mark.asyncio
-    async def test_agent_show_current(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/agent"))
-        text = fake_channel.last_sent_text()
-        assert "agent" in text.lower() or "Agent" in text
-
-    @pytest.mark.asyncio
     async def test_agent_switch(self, multi_agent_router, make_message, fake_channel, session_manager):
         await multi_agent_router.handle_message(make_message(text="/agent codex"))
         text = fake_channel.last_sent_text()
         assert "codex" in text.lower()
-        assert "切换" in text or "✅" in text
+        assert contains_any(text, "切换", "✅")
         current = session_manager.get_active_session("123")
         assert current is None
 
-    @pytest.mark.asyncio
     async def test_agent_switch_keeps_existing_session(
         self, multi_agent_router, make_message, fake_channel, session_manager
     ):
@@ -55,23 +67,10 @@ class TestAgentCommand:
         assert after.session_id == before.session_id
         assert after.agent_name == "codex"
 
-    @pytest.mark.asyncio
-    async def test_agent_switch_invalid(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/agent nonexistent"))
-        text = fake_channel.last_sent_text()
-        assert "❌" in text or "未找到" in text
-
 
 class TestSessionsCommand:
 
-    @pytest.mark.asyncio
-    async def test_sessions_empty(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/sessions"))
-        assert "暂无" in fake_channel.last_sent_text()
-
-    @pytest.mark.asyncio
-    async def test_sessions_list(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_sessions_list(self, router, make_message, fake_channel, seeded_session):
         await router.handle_message(make_message(text="/sessions"))
         text = fake_channel.last_sent_text()
         assert "s1" in text
@@ -79,24 +78,21 @@ class TestSessionsCommand:
 
 class TestCurrentCommand:
 
-    @pytest.mark.asyncio
     async def test_current_no_session(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/current"))
         text = fake_channel.last_sent_text()
-        assert "无活跃" in text or "无" in text
+        assert contains_any(text, "无活跃", "无")
         assert "版本" in text
 
-    @pytest.mark.asyncio
-    async def test_current_show(self, router, make_message, fake_channel, session_manager):
-        router.config.setdefault("runtime", {})["version"] = "git:test123"
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_current_show(self, router_factory, make_message, fake_channel, sample_config, seeded_session):
+        sample_config["runtime"] = {"version": "git:test123"}
+        router = router_factory(config=sample_config)
         await router.handle_message(make_message(text="/current"))
         text = fake_channel.last_sent_text()
         assert "s1" in text
         assert "claude" in text
         assert "git:test123" in text
 
-    @pytest.mark.asyncio
     async def test_current_no_session_shows_scope_agent_preference(self, router, make_message, fake_channel):
         message = make_message(text="/current")
         scope_id = router.get_scope_id(message)
@@ -109,64 +105,35 @@ class TestCurrentCommand:
 
 class TestSwitchCommand:
 
-    @pytest.mark.asyncio
-    async def test_switch_session(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_switch_session(self, router, make_message, fake_channel, session_manager, seeded_session):
         session_manager.create_session("123", "chat_1", "claude", session_id="s2")
         await router.handle_message(make_message(text="/switch s1"))
         text = fake_channel.last_sent_text()
         assert "s1" in text
-        assert "✅" in text or "切换" in text
-
-    @pytest.mark.asyncio
-    async def test_switch_invalid(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/switch nonexistent"))
-        text = fake_channel.last_sent_text()
-        assert "❌" in text or "不存在" in text
-
-    @pytest.mark.asyncio
-    async def test_switch_no_arg(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/switch"))
-        text = fake_channel.last_sent_text()
-        assert "用法" in text or "session_id" in text
+        assert contains_any(text, "✅", "切换")
 
 
 class TestKillCommand:
 
-    @pytest.mark.asyncio
-    async def test_kill_no_session(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/kill"))
-        assert "无活跃" in fake_channel.last_sent_text() or "无" in fake_channel.last_sent_text()
-
-    @pytest.mark.asyncio
     async def test_kill_session(self, router, make_message, fake_channel, session_manager, mock_agent):
         # Create a session via agent + manager
         info = await mock_agent.create_session("123", "chat_1")
         session_manager.create_session("123", "chat_1", "claude", session_id=info.session_id)
         await router.handle_message(make_message(text="/kill"))
         text = fake_channel.last_sent_text()
-        assert "销毁" in text or "🗑️" in text
+        assert contains_any(text, "销毁", "🗑️")
         assert session_manager.get_active_session("123") is None
 
 
 class TestModelCommand:
 
-    @pytest.mark.asyncio
-    async def test_model_list(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/model"))
-        text = fake_channel.last_sent_text()
-        assert "sonnet" in text or "opus" in text or "模型" in text
-
-    @pytest.mark.asyncio
-    async def test_model_switch_with_session(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_model_switch_with_session(self, router, make_message, fake_channel, session_manager, seeded_session):
         await router.handle_message(make_message(text="/model opus"))
         text = fake_channel.last_sent_text()
         assert "opus" in text
-        assert "✅" in text or "切换" in text
+        assert contains_any(text, "✅", "切换")
         assert session_manager.get_session("s1").model == "opus"
 
-    @pytest.mark.asyncio
     async def test_model_switch_no_session_saves_preference(self, router, make_message, fake_channel):
         await router.handle_message(make_message(text="/model opus"))
         text = fake_channel.last_sent_text()
@@ -174,109 +141,75 @@ class TestModelCommand:
         # Preference should be stored
         assert router._user_model_pref.get("telegram:dm:123") == "opus"
 
-    @pytest.mark.asyncio
-    async def test_model_invalid(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_model_invalid(self, router, make_message, fake_channel, seeded_session):
         await router.handle_message(make_message(text="/model nonexistent"))
         text = fake_channel.last_sent_text()
-        assert "❌" in text or "不存在" in text
+        assert contains_any(text, "❌", "不存在")
 
 
 class TestParamCommand:
 
-    @pytest.mark.asyncio
-    async def test_param_no_session(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/param"))
-        assert "❌" in fake_channel.last_sent_text() or "无活跃" in fake_channel.last_sent_text()
-
-    @pytest.mark.asyncio
-    async def test_param_list(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1", params={"thinking": "low"})
+    async def test_param_list(self, router, make_message, fake_channel, seeded_session_thinking_low):
         await router.handle_message(make_message(text="/param"))
         text = fake_channel.last_sent_text()
         assert "thinking" in text
 
-    @pytest.mark.asyncio
-    async def test_param_set(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1", params={})
+    async def test_param_set(self, router, make_message, fake_channel, session_manager, seeded_session):
         await router.handle_message(make_message(text="/param thinking high"))
         text = fake_channel.last_sent_text()
         assert "✅" in text
         assert session_manager.get_session("s1").params["thinking"] == "high"
 
-    @pytest.mark.asyncio
-    async def test_param_invalid_key(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_param_invalid_key(self, router, make_message, fake_channel, seeded_session):
         await router.handle_message(make_message(text="/param invalid_key value"))
         assert "❌" in fake_channel.last_sent_text()
 
-    @pytest.mark.asyncio
-    async def test_param_missing_value(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
+    async def test_param_missing_value(self, router, make_message, fake_channel, seeded_session):
         await router.handle_message(make_message(text="/param thinking"))
         assert "用法" in fake_channel.last_sent_text()
 
 
 class TestParamsCommand:
 
-    @pytest.mark.asyncio
-    async def test_params_show(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1", model="opus", params={"thinking": "high"})
+    async def test_params_show(self, router, make_message, fake_channel, seeded_session_opus):
         await router.handle_message(make_message(text="/params"))
         text = fake_channel.last_sent_text()
         assert "opus" in text
         assert "thinking" in text
 
-    @pytest.mark.asyncio
-    async def test_params_no_session(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/params"))
-        assert "❌" in fake_channel.last_sent_text() or "无活跃" in fake_channel.last_sent_text()
-
 
 class TestResetCommand:
 
-    @pytest.mark.asyncio
-    async def test_reset(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1", model="opus", params={"thinking": "high"})
+    async def test_reset(self, router, make_message, fake_channel, session_manager, seeded_session_opus):
         await router.handle_message(make_message(text="/reset"))
         text = fake_channel.last_sent_text()
-        assert "✅" in text or "重置" in text
+        assert contains_any(text, "✅", "重置")
         s = session_manager.get_session("s1")
         assert s.model == "sonnet"  # default
         assert s.params == {"thinking": "low"}  # default
 
-    @pytest.mark.asyncio
-    async def test_reset_no_session(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="/reset"))
-        assert "❌" in fake_channel.last_sent_text() or "无活跃" in fake_channel.last_sent_text()
-
 
 class TestKapyFormat:
 
-    @pytest.mark.asyncio
-    async def test_kapy_help(self, router, make_message, fake_channel):
-        await router.handle_message(make_message(text="kapy help"))
-        text = fake_channel.last_sent_text()
-        assert "命令" in text or "help" in text.lower()
-
-    @pytest.mark.asyncio
-    async def test_kapy_model_switch(self, router, make_message, fake_channel, session_manager):
-        session_manager.create_session("123", "chat_1", "claude", session_id="s1")
-        await router.handle_message(make_message(text="kapy model opus"))
-        text = fake_channel.last_sent_text()
-        assert "opus" in text
-
-    @pytest.mark.asyncio
-    async def test_kapy_empty_stripped_to_bare_word(self, router, make_message, fake_channel, mock_agent):
-        # "kapy " gets stripped to "kapy" which doesn't start with "kapy "
-        # so it's forwarded to agent as plain text
-        await router.handle_message(make_message(text="kapy "))
-        # The stripped text "kapy" goes to _forward_to_agent
-        assert len(mock_agent.messages_received) >= 1
-
-    @pytest.mark.asyncio
-    async def test_kapy_with_empty_subcommand(self, router, make_message, fake_channel):
-        # "kapy  " with double space: stripped to "kapy" → forwarded to agent
-        # This is expected behavior — bare "kapy" word is treated as normal text
-        await router.handle_message(make_message(text="kapy  "))
-        assert len(fake_channel.sent) >= 1
+    async def test_kapy_batch(self, isolated_router_factory, make_message):
+        help_router, help_channel, _, _ = isolated_router_factory()
+        model_router, model_channel, _, model_sessions = isolated_router_factory()
+        bare_router, _, bare_agent, _ = isolated_router_factory()
+        double_router, double_channel, _, _ = isolated_router_factory()
+        model_sessions.create_session("123", "chat_1", "claude", session_id="s1")
+
+        await asyncio.gather(
+            help_router.handle_message(make_message(text="kapy help")),
+            model_router.handle_message(make_message(text="kapy model opus")),
+            # "kapy " gets stripped to "kapy" which doesn't start with "kapy ",
+            # so it's forwarded to the agent as plain text
+            bare_router.handle_message(make_message(text="kapy ")),
+            # "kapy  " with double space: also stripped to bare "kapy" → forwarded
+            double_router.handle_message(make_message(text="kapy  ")),
+        )
+
+        text = help_channel.last_sent_text()
+        assert contains_any(text.lower(), "命令", "help")
+        assert "opus" in model_channel.last_sent_text()
+        assert len(bare_agent.messages_received) >= 1
+        assert len(double_channel.sent) >= 1
@@ -5,14 +5,42 @@ import time
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
-import pytest
-
 from channels.base import Attachment, IncomingMessage
+from core.router import Router
+from tests._matchers import contains_any
+
+
+class FakeEmailChannel:
+    """Minimal email-like channel exposing the session-log hooks."""
+
+    __slots__ = ("sent", "_reply_session", "_saved_log")
+    supports_streaming = False
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, chat_id, text):
+        self.sent.append(text)
+        return 1
+
+    async def send_typing(self, chat_id):
+        pass
+
+    async def edit_message(self, chat_id, mid, text):
+        pass
+
+    async def cleanup_attachments(self, msg):
+        pass
+
+    def set_reply_session(self, chat_id, session_id):
+        self._reply_session = (chat_id, session_id)
+
+    def save_session_log(self, sender_addr, session_id, prompt, response):
+        self._saved_log = (sender_addr, session_id, prompt, response)
 
 
 class TestForwardBasic:
 
-    @pytest.mark.asyncio
     async def test_forward_basic_text(self, router, make_message, fake_channel, mock_agent):
         msg = make_message(text="hello world")
         await router.handle_message(msg)
@@ -21,7 +49,6 @@ class TestForwardBasic:
         # Channel should have sent a response
         assert len(fake_channel.sent) >= 1
 
-    @pytest.mark.asyncio
     async def test_forward_creates_session_auto(self, router, make_message, fake_channel, session_manager):
         msg = make_message(text="first message")
         await router.handle_message(msg)
@@ -33,7 +60,6 @@ class TestForwardBasic:
 
 class TestContextInjection:
 
-    @pytest.mark.asyncio
     async def test_forward_injects_recent_context_on_followup(self, router, make_message, mock_agent):
         await router.handle_message(make_message(text="请检查端口 208 和 5900 的访问规则"))
         await router.handle_message(make_message(text="开放它"))
@@ -44,7 +70,6 @@ class TestContextInjection:
         assert "端口 208 和 5900" in second_prompt
         assert "开放它" in second_prompt
 
-    @pytest.mark.asyncio
     async def test_forward_injects_reply_target_context(self, router, make_message, mock_agent):
         msg = IncomingMessage(
             channel="telegram",
@@ -66,14 +91,12 @@ class TestContextInjection:
 
 class TestStreamingResponse:
 
-    @pytest.mark.asyncio
     async def test_forward_streaming_response(self, router, make_message, fake_channel, mock_agent):
         mock_agent.set_response(["chunk1", "chunk2", "chunk3"])
         await router.handle_message(make_message(text="test"))
         # Should have at least sent one message
         assert len(fake_channel.sent) >= 1
 
-    @pytest.mark.asyncio
     async def test_forward_batch_response(self, router, make_message, fake_channel, mock_agent):
         fake_channel.supports_streaming = False
         mock_agent.set_response(["full response"])
@@ -85,7 +108,6 @@ class TestStreamingResponse:
 
 class TestAttachments:
 
-    @pytest.mark.asyncio
     async def test_forward_with_attachments(self, router, make_message, fake_channel, mock_agent, tmp_path):
         # Create a temp file to be the attachment
         att_file = tmp_path / "test.txt"
@@ -99,24 +121,22 @@ class TestAttachments:
         assert "附件" in prompt
         assert "test.txt" in prompt
 
-    @pytest.mark.asyncio
     async def test_forward_oversized_attachment(self, router, make_message, fake_channel, mock_agent):
         att = Attachment(filename="big.bin", filepath="/tmp/big", mime_type="application/octet-stream", size_bytes=20 * 1024 * 1024)
         msg = make_message(text="check this", attachments=[att])
         await router.handle_message(msg)
         # Should warn about oversized attachment
         sent_texts = [t for _, t in fake_channel.sent]
-        assert any("超过" in t or "限制" in t for t in sent_texts)
+        assert any(contains_any(t, "超过", "限制") for t in sent_texts)
 
 
 class TestSessionBusy:
 
-    @pytest.mark.asyncio
     async def test_forward_session_busy(self, router, make_message, fake_channel, mock_agent):
         # Create session first
         msg1 = make_message(text="first")
         await router.handle_message(msg1)
-        session_id = list(mock_agent.sessions.keys())[0]
+        session_id = next(iter(mock_agent.sessions))
 
         # Lock the session manually to simulate busy
         router._session_locks[session_id] = asyncio.Lock()
@@ -134,7 +154,6 @@ class TestSessionBusy:
 
 class TestBilling:
 
-    @pytest.mark.asyncio
     async def test_forward_records_billing(self, router, make_message, fake_channel, mock_agent, billing):
         await router.handle_message(make_message(text="test"))
         # Billing should have recorded
@@ -145,31 +164,11 @@ class TestBilling:
 
 class TestEmailSessionLog:
 
-    @pytest.mark.asyncio
-    async def test_forward_email_session_log(self, auth, session_manager, mock_agent, sample_config, billing):
+    async def test_forward_email_session_log(self, auth, router_factory):
         """Email channel should trigger save_session_log."""
-        from core.router import Router
-
-        class FakeEmailChannel:
-            supports_streaming = False
-            sent = []
-            async def send_text(self, chat_id, text):
-                self.sent.append(text)
-                return 1
-            async def send_typing(self, chat_id):
-                pass
-            async def edit_message(self, chat_id, mid, text):
-                pass
-            async def cleanup_attachments(self, msg):
-                pass
-            def set_reply_session(self, chat_id, session_id):
-                self._reply_session = (chat_id, session_id)
-            def save_session_log(self, sender_addr, session_id, prompt, response):
-                self._saved_log = (sender_addr, session_id, prompt, response)
-
         auth.add_user("user@test.com", "email")
         ch = FakeEmailChannel()
-        r = Router(auth=auth, session_manager=session_manager, agents={"claude": mock_agent}, channel=ch, config=sample_config, billing=billing)
+        r = router_factory(channel=ch)
 
         msg = IncomingMessage(
             channel="email", chat_id="user@test.com", user_id="user@test.com",
@@ -183,11 +182,9 @@ class TestEmailSessionLog:
 class TestFormatConversion:
 
     def test_fmt_telegram_passthrough(self):
-        from core.router import Router
         assert Router._fmt("telegram", "<b>bold</b>") == "<b>bold</b>"
 
     def test_fmt_discord_conversion(self):
-        from core.router import Router
         result = Router._fmt("discord", "<b>bold</b> <code>code</code> &lt;tag&gt;")
         assert "**bold**" in result
         assert "`code`" in result
@@ -196,7 +193,6 @@ class TestFormatConversion:
 
 class TestUnauthorized:
 
-    @pytest.mark.asyncio
     async def test_unauthorized_message(self, router, make_message, fake_channel):
         msg = make_message(text="hello", user_id="999")
         await router.handle_message(msg)
@@ -205,7 +201,6 @@ class TestUnauthorized:
 
 class TestUnknownCommand:
 
-    @pytest.mark.asyncio
     async def test_unknown_command_forwarded_to_agent(self, router, make_message, fake_channel, mock_agent):
         msg = make_message(text="/unknowncmd something")
         await router.handle_message(msg)
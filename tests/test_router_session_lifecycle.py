@@ -3,23 +3,21 @@
 import pytest
 
 from channels.base import IncomingMessage
+from tests._matchers import contains_any
 
 
 class TestAutoCreateSession:
 
-    @pytest.mark.asyncio
     async def test_auto_create_session(self, router, make_message, fake_channel, session_manager):
         await router.handle_message(make_message(text="hello"))
         active = session_manager.get_active_session("123")
         assert active is not None
 
-    @pytest.mark.asyncio
     async def test_auto_create_with_default_params(self, router, make_message, fake_channel, session_manager):
         await router.handle_message(make_message(text="hello"))
         active = session_manager.get_active_session("123")
         assert active.params == {"thinking": "low"}  # from default_params
 
-    @pytest.mark.asyncio
     async def test_scope_workspace_partition(self, router, make_message, fake_channel, session_manager):
         await router.handle_message(make_message(text="dm hello", chat_id="dm-1", is_private=True))
         dm_scope = "telegram:dm:123"
@@ -39,7 +37,6 @@ class TestAutoCreateSession:
 
 class TestModelPreference:
 
-    @pytest.mark.asyncio
     async def test_auto_create_with_model_preference(self, router, make_message, fake_channel, session_manager):
         # Set model preference before any session exists
         router._user_model_pref["123"] = "opus"
@@ -52,7 +49,6 @@ class TestModelPreference:
 
 class TestRecoverStaleSession:
 
-    @pytest.mark.asyncio
     async def test_recover_stale_session(self, router, make_message, fake_channel, session_manager, mock_agent):
         # Create initial session
         await router.handle_message(make_message(text="first"))
@@ -77,7 +73,6 @@ class TestRecoverStaleSession:
 
 class TestCleanupOrphanBusy:
 
-    @pytest.mark.asyncio
     async def test_cleanup_orphan_busy(self, router, make_message, fake_channel, mock_agent):
         # Create session
         await router.handle_message(make_message(text="first"))
@@ -105,21 +100,9 @@ class TestCleanupOrphanBusy:
 
 class TestEmailSessionHint:
 
-    @pytest.mark.asyncio
-    async def test_email_session_hint_resume(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel
-    ):
-        from core.router import Router
-
+    async def test_email_session_hint_resume(self, auth, session_manager, mock_agent, router_factory):
         auth.add_user("user@test.com", "email")
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-        )
+        r = router_factory()
 
         # Create a session manually
         info = await mock_agent.create_session("user@test.com", "user@test.com")
@@ -136,21 +119,9 @@ class TestEmailSessionHint:
         active = session_manager.get_active_session("user@test.com")
         assert active.session_id == info.session_id
 
-    @pytest.mark.asyncio
-    async def test_email_session_hint_invalid(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel
-    ):
-        from core.router import Router
-
+    async def test_email_session_hint_invalid(self, auth, session_manager, router_factory):
         auth.add_user("user@test.com", "email")
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-        )
+        r = router_factory()
 
         # Send email with invalid hint → should create new session
         msg = IncomingMessage(
@@ -166,35 +137,14 @@ class TestEmailSessionHint:
 
 class TestAgentNotAvailable:
 
-    def test_router_with_no_agents_raises(self, auth, session_manager, sample_config, billing, fake_channel):
+    def test_router_with_no_agents_raises(self, router_factory):
         """Router requires at least one agent — empty dict causes StopIteration in __init__."""
-        from core.router import Router
-
         with pytest.raises(StopIteration):
-            Router(
-                auth=auth,
-                session_manager=session_manager,
-                agents={},
-                channel=fake_channel,
-                config=sample_config,
-                billing=billing,
-            )
-
-    @pytest.mark.asyncio
-    async def test_agent_mismatch_preference(
-        self, auth, session_manager, mock_agent, sample_config, billing, fake_channel
-    ):
+            router_factory(agents={})
+
+    async def test_agent_mismatch_preference(self, router_factory, fake_channel):
         """User prefers an agent that doesn't exist → error message."""
-        from core.router import Router
-
-        r = Router(
-            auth=auth,
-            session_manager=session_manager,
-            agents={"claude": mock_agent},
-            channel=fake_channel,
-            config=sample_config,
-            billing=billing,
-        )
+        r = router_factory()
         # Set user preference to nonexistent agent
         r._user_agent_pref["123"] = "nonexistent"
 
@@ -204,4 +154,4 @@ class TestAgentNotAvailable:
         )
         await r.handle_message(msg)
         text = fake_channel.last_sent_text()
-        assert "不可用" in text or "❌" in text
+        assert contains_any(text, "不可用", "❌")
@@ -6,17 +6,22 @@ from pathlib import Path
 from core.rules import RulesLoader
 
 
-@pytest.fixture
-def rules_dir(tmp_path):
-    d = tmp_path / "rules"
-    d.mkdir()
+def _write_rules(d: Path) -> Path:
+    d.mkdir(exist_ok=True)
     (d / "telegram.md").write_text("You are in a Telegram chat.", encoding="utf-8")
     (d / "discord.md").write_text("You are in Discord.", encoding="utf-8")
     return d
 
 
+@pytest.fixture(scope="module")
+def rules_dir(tmp_path_factory):
+    # Shared read-only: tests that modify rule files must use their own dir.
+    return _write_rules(tmp_path_factory.mktemp("rules"))
+
+
 @pytest.fixture
 def loader(rules_dir):
+    # Fresh loader per test so cache state never leaks between tests.
     return RulesLoader(rules_dir=rules_dir)
 
 
@@ -29,7 +34,9 @@ class TestGetRules:
     def test_get_rules_missing(self, loader):
         assert loader.get_rules("sms") is None
 
-    def test_get_rules_cached(self, loader, rules_dir):
+    def test_get_rules_cached(self, tmp_path):
+        rules_dir = _write_rules(tmp_path / "rules")
+        loader = RulesLoader(rules_dir=rules_dir)
         loader.get_rules("telegram")
         # Modify file after cache
         (rules_dir / "telegram.md").write_text("MODIFIED", encoding="utf-8")
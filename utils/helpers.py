@@ -1,11 +1,42 @@
 """
 Utility functions for CLI Gateway
 """
+import copy
+import functools
 import os
 import re
 import yaml
 from typing import Any, Dict
 
+# libyaml-backed loader when PyYAML was built with it; same safe subset either way
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_ENV_VAR_RE = re.compile(r'\$\{([A-Za-z_][A-Za-z0-9_]*)\}')
+_SESSION_ID_RE = re.compile(r'[a-f0-9]{8}')
+
+# truncate_text markup detection and the markdown characters it removes
+_HTML_TAG_HINT_RE = re.compile(r'</?\w+[^>]*>')
+_MARKDOWN_HINT_RE = re.compile(r'[*_`\[\]]')
+_MARKDOWN_STRIP_TABLE = str.maketrans('', '', '*_`[]()~>#+-=|{}.!')
+
+
+@functools.lru_cache(maxsize=64)
+def _read_config_text(abspath: str, ino: int, mtime_ns: int, ctime_ns: int, size: int) -> str:
+    """Read a config file; cached per (path, inode, mtime, ctime, size) so unchanged files are read once.
+
+    ctime catches same-size edits whose mtime was reset (it cannot be set from
+    userspace) and the inode catches atomic replaces. An in-place edit that
+    keeps the size and lands in the same ctime tick is still served from cache.
+    """
+    with open(abspath, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_config_text(config_str: str) -> Any:
+    """Parse substituted config text; callers must deepcopy the shared result."""
+    return yaml.load(config_str, Loader=_YAML_LOADER)
+
 
 def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     """
@@ -13,44 +44,68 @@ def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     
     Supports ${VAR_NAME} syntax for environment variables
     """
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Configuration file not found: {config_path}")
-    
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config_str = f.read()
-    
-    # Replace environment variables
-    def replace_env(match):
-        var_name = match.group(1)
-        value = os.getenv(var_name)
-        if value is None:
-            raise ValueError(f"Environment variable {var_name} is not set")
-        return value
-    
-    config_str = re.sub(r'\$\{([A-Za-z_][A-Za-z0-9_]*)\}', replace_env, config_str)
+    try:
+        st = os.stat(config_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Configuration file not found: {config_path}") from None
+
+    config_str = _read_config_text(
+        os.path.abspath(config_path), st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size
+    )
     
-    config = yaml.safe_load(config_str)
-    return config
+    # Replace environment variables (most configs have none, so skip the regex pass)
+    if "${" in config_str:
+        def replace_env(match):
+            var_name = match.group(1)
+            value = os.getenv(var_name)
+            if value is None:
+                raise ValueError(f"Environment variable {var_name} is not set")
+            return value
+
+        config_str = _ENV_VAR_RE.sub(replace_env, config_str)
+
+    # Parse is keyed by the substituted text, so env changes still take effect.
+    return copy.deepcopy(_parse_config_text(config_str))
 
 
 def sanitize_session_id(session_id: str) -> str:
     """Validate and sanitize session ID (prevent path traversal)"""
-    if not re.match(r'^[a-f0-9]{8}$', session_id):
+    if not _SESSION_ID_RE.fullmatch(session_id):
         raise ValueError(f"Invalid session ID format: {session_id}")
     return session_id
 
 
+def _strip_html_tags(text: str) -> str:
+    """Remove <...> tags in one left-to-right pass; same result as re.sub(r'<[^>]+>', '', text)."""
+    parts = []
+    pos = 0
+    while True:
+        start = text.find('<', pos)
+        if start < 0:
+            break
+        end = text.find('>', start + 1)
+        if end < 0:
+            # No closing '>' anywhere after this point, so no more tags
+            break
+        if end == start + 1:
+            # "<>" is not a tag: keep the '<' and carry on from the '>'
+            parts.append(text[pos:end])
+            pos = end
+            continue
+        parts.append(text[pos:start])
+        pos = end + 1
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
 def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     """Truncate text safely; strip markup first to avoid broken HTML/Markdown tags"""
     if len(text) <= max_length:
         return text
 
     # If text appears to contain markup, convert to plain text before truncation
-    has_html = bool(re.search(r'</?\w+[^>]*>', text))
-    has_markdown = bool(re.search(r'[*_`\[\]]', text))
-    if has_html or has_markdown:
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'[*_`\[\]()~>#+\-=|{}.!]', '', text)
+    if _MARKDOWN_HINT_RE.search(text) or _HTML_TAG_HINT_RE.search(text):
+        text = _strip_html_tags(text).translate(_MARKDOWN_STRIP_TABLE)
 
     if len(text) <= max_length:
         return text